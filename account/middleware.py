@@ -1,6 +1,15 @@
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
 from django.contrib.auth.models import AnonymousUser
-from .models import User as AccountUser
+from .user_cache import get_user
+
+
+def _session_user(request):
+    if not hasattr(request, '_cached_session_user'):
+        user_id = request.session.get('user_id')
+        user = get_user(user_id) if user_id else None
+        request._cached_session_user = user or AnonymousUser()
+    return request._cached_session_user
 
 
 class SessionAuthMiddleware(MiddlewareMixin):
@@ -9,17 +18,11 @@ class SessionAuthMiddleware(MiddlewareMixin):
     This middleware makes the rest of the codebase work without Django's
     authentication system by ensuring `request.user` is the project `User`
     when a session exists, and an `AnonymousUser` otherwise.
+
+    The user is resolved lazily, once per request, through
+    account.user_cache; decorators and views should use `request.user`
+    instead of querying the User again.
     """
 
     def process_request(self, request):
-        user_id = request.session.get('user_id')
-        if user_id:
-            try:
-                user = AccountUser.objects.get(id=user_id)
-                # mark as authenticated for compatibility
-                setattr(user, 'is_authenticated', True)
-                request.user = user
-            except AccountUser.DoesNotExist:
-                request.user = AnonymousUser()
-        else:
-            request.user = AnonymousUser()
+        request.user = SimpleLazyObject(lambda: _session_user(request))
@@ -1,5 +1,7 @@
 from django.db import models
 
+from event.derivatives import derivative_url
+
 class Role(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True, null=True)
@@ -28,9 +30,19 @@ class User(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # admin user / vendor lists (event.pagination)
+            models.Index(fields=['role', '-created_at'], name='user_role_recent_idx'),
+        ]
+
     def __str__(self):
         return self.fullname
 
+    @property
+    def logo_thumbnail_url(self):
+        return derivative_url(self.business_logo, 'thumb')
+
 
 class Token(models.Model):
     """Simple token/credit balance for a user."""
@@ -1,3 +1,45 @@
-from django.test import TestCase
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.test import RequestFactory, TestCase, override_settings
+
+from account.middleware import SessionAuthMiddleware
+from account.models import User
+from event.testing import make_user
+
+
+class SessionUserTests(TestCase):
+    """request.user comes from account.user_cache and never outlives a save."""
+
+    def setUp(self):
+        self.user = make_user('Customer', is_active=True)
+
+    def request_user(self):
+        request = RequestFactory().get('/')
+        request.session = {'user_id': self.user.id}
+        SessionAuthMiddleware(lambda request: None).process_request(request)
+        return request.user
+
+    def use_shared_cache(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        self.enterContext(override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }}))
+
+    def test_shared_cache_serves_the_user_until_it_is_saved(self):
+        self.use_shared_cache()
+        self.assertTrue(self.request_user().is_active)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.request_user().role.name, 'user')
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(self.request_user().is_active)
+
+    def test_process_local_cache_is_not_used(self):
+        self.assertTrue(self.request_user().is_active)
+        # a write no signal sees, e.g. from another process
+        User.objects.filter(id=self.user.id).update(is_active=False)
+        with self.assertNumQueries(1):
+            self.assertFalse(self.request_user().is_active)
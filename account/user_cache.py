@@ -0,0 +1,50 @@
+"""
+Short-lived cache of session users behind request.user, used only when
+USER_CACHE_ALIAS is shared by every process.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import User
+
+USER_CACHE_TTL = getattr(settings, 'USER_CACHE_TTL', 60)
+USER_CACHE_ALIAS = getattr(settings, 'USER_CACHE_ALIAS', 'default')
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def _key(user_id):
+    return f'account:user:{user_id}'
+
+
+def _shared_cache():
+    """The cache alias USER_CACHE_ALIAS, or None when it is process-local."""
+    if settings.CACHES[USER_CACHE_ALIAS]['BACKEND'] in PROCESS_LOCAL_BACKENDS:
+        return None
+    return caches[USER_CACHE_ALIAS]
+
+
+def get_user(user_id):
+    """Return the User with *user_id* (role preloaded), or None if it does not exist."""
+    cache = _shared_cache()
+    user = cache.get(_key(user_id)) if cache is not None else None
+    if user is None:
+        try:
+            user = User.objects.select_related('role').get(id=user_id)
+        except (User.DoesNotExist, ValueError, TypeError):
+            return None
+        if cache is not None:
+            cache.set(_key(user_id), user, USER_CACHE_TTL)
+    # mark as authenticated for compatibility with code written for auth.User
+    user.is_authenticated = True
+    return user
+
+
+def invalidate_user(user_id):
+    cache = _shared_cache()
+    if cache is not None:
+        cache.delete(_key(user_id))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from admin_pannel import stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the admin dashboard's hourly/daily statistics rollups (run periodically, e.g. from cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=2,
+            help="Recompute this many most recent days, plus any day marked stale (default: 2).",
+        )
+        parser.add_argument("--all", action="store_true", help="Rebuild the rollups from all history.")
+
+    def handle(self, *args, **options):
+        days = None if options["all"] else max(options["days"], 1)
+        stats.rebuild(days)
+        scope = "all history" if days is None else f"the last {days} day(s)"
+        self.stdout.write(self.style.SUCCESS(f"Rolled up platform statistics for {scope}"))
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:06
+
+from django.db import migrations, models
+
+
+def create_lock_row(apps, schema_editor):
+    StatsRefreshLock = apps.get_model('admin_pannel', 'StatsRefreshLock')
+    StatsRefreshLock.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_pannel', '0001_stats_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatsRefreshLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('held_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(create_lock_row, reverse_code=migrations.RunPython.noop),
+    ]
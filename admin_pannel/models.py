@@ -1,3 +1,51 @@
 from django.db import models
 
-# Create your models here.
+
+class StatsRollup(models.Model):
+    """One platform metric for one hour, one day, or all time (admin_pannel.stats)."""
+
+    PERIOD_HOUR = 'hour'
+    PERIOD_DAY = 'day'
+    PERIOD_TOTAL = 'total'
+
+    PERIOD_CHOICES = [
+        (PERIOD_HOUR, 'Hour'),
+        (PERIOD_DAY, 'Day'),
+        (PERIOD_TOTAL, 'Total'),
+    ]
+
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    # start of the bucket; a fixed epoch for PERIOD_TOTAL
+    start = models.DateTimeField()
+    metric = models.CharField(max_length=50)
+    value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'metric', 'start'], name='stats_rollup_bucket_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.period} {self.start:%Y-%m-%d %H:%M} {self.metric}={self.value}"
+
+
+class StatsDirtyDay(models.Model):
+    """A day whose rollups are stale because a row created on it was written."""
+
+    day = models.DateField(unique=True)
+    marked_at = models.DateTimeField()
+
+    def __str__(self):
+        return str(self.day)
+
+
+class StatsRefreshLock(models.Model):
+    """
+    Single row that refresh()/rebuild() update first, so their delete-and-
+    insert transactions run one at a time (admin_pannel.stats).
+    """
+
+    held_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"stats lock (last held {self.held_at})"
@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from account.models import User
+from admin_pannel import stats
+from user.models import Event, Payment, Review
+from vendor.models import Booking, category
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def platform_row_changed(sender, instance, **kwargs):
+    """The row's creation-day rollups (admin_pannel.stats) are now stale."""
+    stats.mark_dirty(instance.created_at)
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def payment_changed(sender, instance, **kwargs):
+    stats.mark_dirty(instance.payment_date)
+
+
+@receiver(post_save, sender=category)
+@receiver(post_delete, sender=category)
+def category_changed(sender, instance, **kwargs):
+    stats.mark_dirty()
@@ -0,0 +1,257 @@
+"""
+Materialized platform statistics for the admin dashboard and analytics page.
+Dirty days are rebuilt by refresh(); `manage.py rollup_stats --all` rebuilds
+everything.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from account.models import User
+from admin_pannel.models import StatsDirtyDay, StatsRefreshLock, StatsRollup
+from user.models import Event, Payment, Review
+from vendor.models import Booking, category
+
+HOURLY_RETENTION_DAYS = getattr(settings, "STATS_HOURLY_RETENTION_DAYS", 35)
+
+# start of every PERIOD_TOTAL row
+EPOCH = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+
+HOUR, DAY, TOTAL = StatsRollup.PERIOD_HOUR, StatsRollup.PERIOD_DAY, StatsRollup.PERIOD_TOTAL
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _value(metric, value):
+    """Money metrics stay Decimal, counts become ints."""
+    if metric.startswith("revenue."):
+        return value or Decimal("0.00")
+    return int(value or 0)
+
+
+class _Figures(dict):
+    """A metrics dict that reads absent counts as 0."""
+
+    def __missing__(self, metric):
+        return _value(metric, None)
+
+
+# ---------------------------------------------------------------------------
+# Marking stale days
+# ---------------------------------------------------------------------------
+
+def mark_dirty(created_at=None) -> None:
+    """Flag the day *created_at* falls on (default today) for recomputation."""
+    day = timezone.localdate(created_at) if created_at else timezone.localdate()
+    StatsDirtyDay.objects.bulk_create(
+        [StatsDirtyDay(day=day, marked_at=timezone.now())],
+        update_conflicts=True, unique_fields=["day"], update_fields=["marked_at"],
+    )
+
+
+@contextmanager
+def _exclusive():
+    """
+    A transaction holding the StatsRefreshLock row.  The UPDATE takes its row
+    lock (the write lock on SQLite), so another refresh waits for this one
+    to commit and then replaces the rows it wrote.
+    """
+    with transaction.atomic():
+        locked = StatsRefreshLock.objects.filter(pk=1)
+        if not locked.update(held_at=timezone.now()):
+            StatsRefreshLock.objects.get_or_create(pk=1)
+            locked.update(held_at=timezone.now())
+        yield
+
+
+# ---------------------------------------------------------------------------
+# Computing buckets
+# ---------------------------------------------------------------------------
+
+def _grouped(queryset, field, start, end, *dimensions, **aggregates):
+    return (
+        queryset
+        .filter(**{f"{field}__gte": start, f"{field}__lt": end})
+        .annotate(hour=TruncHour(field))
+        .values("hour", *dimensions)
+        .annotate(**aggregates)
+        .order_by()
+    )
+
+
+def _hourly(start, end) -> dict:
+    """{(hour, metric): value} for everything created in [start, end)."""
+    buckets = defaultdict(Decimal)
+
+    def add(hour, metric, value):
+        buckets[hour, metric] += value or 0
+
+    for row in _grouped(Event.objects, "created_at", start, end, "status", n=Count("id")):
+        add(row["hour"], "events.created", row["n"])
+        add(row["hour"], f"events.status.{row['status']}", row["n"])
+
+    for row in _grouped(User.objects, "created_at", start, end, "role__name", "is_active", n=Count("id")):
+        role = (row["role__name"] or "").lower()
+        if role == "vendor":
+            add(row["hour"], "vendors.joined", row["n"])
+            add(row["hour"], "vendors.active" if row["is_active"] else "vendors.pending", row["n"])
+        elif role == "user":
+            add(row["hour"], "users.joined", row["n"])
+
+    for row in _grouped(Booking.objects, "created_at", start, end, "status", n=Count("id"), amount=Sum("amount")):
+        add(row["hour"], "bookings.created", row["n"])
+        add(row["hour"], f"bookings.status.{row['status']}", row["n"])
+        if row["status"] == Booking.STATUS_CONFIRMED:
+            add(row["hour"], "revenue.bookings", row["amount"])
+
+    payments = Payment.objects.filter(status=Payment.STATUS_SUCCESS)
+    for row in _grouped(payments, "payment_date", start, end, n=Count("id"), amount=Sum("amount")):
+        add(row["hour"], "payments.succeeded", row["n"])
+        add(row["hour"], "revenue.payments", row["amount"])
+
+    for row in _grouped(Review.objects, "created_at", start, end, n=Count("id")):
+        add(row["hour"], "reviews.created", row["n"])
+
+    return buckets
+
+
+def _rebuild_range(start, end) -> None:
+    """Recompute the hour and day rows for [start, end); both on day boundaries."""
+    hourly = _hourly(start, end)
+    daily = defaultdict(Decimal)
+    for (hour, metric), value in hourly.items():
+        daily[_day_start(timezone.localdate(hour)), metric] += value
+
+    keep_hours_from = timezone.now() - timedelta(days=HOURLY_RETENTION_DAYS)
+    rows = [
+        StatsRollup(period=HOUR, start=hour, metric=metric, value=value)
+        for (hour, metric), value in hourly.items()
+        if value and hour >= keep_hours_from
+    ]
+    rows += [
+        StatsRollup(period=DAY, start=day, metric=metric, value=value)
+        for (day, metric), value in daily.items()
+        if value
+    ]
+    with _exclusive():
+        StatsRollup.objects.filter(period__in=[HOUR, DAY], start__gte=start, start__lt=end).delete()
+        StatsRollup.objects.bulk_create(rows)
+
+
+def _rebuild_totals() -> None:
+    with _exclusive():
+        # summed under the lock, so the totals match the day rows last committed
+        sums = (
+            StatsRollup.objects.filter(period=DAY)
+            .values("metric").annotate(total=Sum("value")).order_by()
+        )
+        rows = [StatsRollup(period=TOTAL, start=EPOCH, metric=row["metric"], value=row["total"]) for row in sums]
+        rows.append(StatsRollup(period=TOTAL, start=EPOCH, metric="categories.total", value=category.objects.count()))
+        StatsRollup.objects.filter(period=TOTAL).delete()
+        StatsRollup.objects.bulk_create(rows)
+
+
+def _clear_marks(marks) -> None:
+    # a mark re-set after we read *marks* is newer than all of them and survives
+    if marks:
+        StatsDirtyDay.objects.filter(
+            day__in={mark.day for mark in marks},
+            marked_at__lte=max(mark.marked_at for mark in marks),
+        ).delete()
+
+
+def rebuild(days=None) -> None:
+    """Recompute the last *days* days (today included), or all history if None."""
+    marks = list(StatsDirtyDay.objects.all())
+    today = timezone.localdate()
+    start = EPOCH if days is None else _day_start(today - timedelta(days=days - 1))
+    _rebuild_range(start, _day_start(today + timedelta(days=1)))
+    if days is not None:
+        for mark in marks:
+            if _day_start(mark.day) < start:
+                _rebuild_range(_day_start(mark.day), _day_start(mark.day + timedelta(days=1)))
+    _rebuild_totals()
+    _clear_marks(marks)
+    prune()
+
+
+def prune() -> int:
+    cutoff = timezone.now() - timedelta(days=HOURLY_RETENTION_DAYS)
+    deleted, _ = StatsRollup.objects.filter(period=HOUR, start__lt=cutoff).delete()
+    return deleted
+
+
+def refresh() -> bool:
+    """
+    Recompute the days marked dirty (StatsDirtyDay) since the last refresh.
+    Returns False, computing nothing, while the rollups have never been
+    built.
+    """
+    if not StatsRollup.objects.filter(period=TOTAL).exists():
+        return False
+    marks = list(StatsDirtyDay.objects.all())
+    if not marks:
+        return True
+    for day in sorted({mark.day for mark in marks}):
+        _rebuild_range(_day_start(day), _day_start(day + timedelta(days=1)))
+    _rebuild_totals()
+    _clear_marks(marks)
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def totals() -> dict:
+    """{metric: current platform total}; missing metrics read as 0."""
+    rows = StatsRollup.objects.filter(period=TOTAL).values_list("metric", "value")
+    return _Figures({metric: _value(metric, value) for metric, value in rows})
+
+
+def since(**cutoffs) -> dict:
+    """
+    Metric sums over the hourly rows newer than each cutoff, in one query:
+    since(week=t1, month=t2) -> {"week": {...}, "month": {...}}.
+    Cutoffs must fall within the hourly retention window.
+    """
+    rows = (
+        StatsRollup.objects
+        .filter(period=HOUR, start__gte=min(cutoffs.values()))
+        .values("metric")
+        .annotate(**{name: Sum("value", filter=Q(start__gte=cutoff)) for name, cutoff in cutoffs.items()})
+        .order_by()
+    )
+    result = {name: _Figures() for name in cutoffs}
+    for row in rows:
+        for name in cutoffs:
+            result[name][row["metric"]] = _value(row["metric"], row[name])
+    return result
+
+
+def daily_series(days: int, **metrics) -> list:
+    """
+    One dict per day for the last *days* days, oldest first, zero-filled:
+    daily_series(14, revenue="revenue.payments") ->
+    [{"day": date, "revenue": Decimal}, ...].
+    """
+    today = timezone.localdate()
+    first = today - timedelta(days=days - 1)
+    rows = StatsRollup.objects.filter(
+        period=DAY, start__gte=_day_start(first), metric__in=metrics.values(),
+    ).values_list("start", "metric", "value")
+    found = {(timezone.localdate(start), metric): value for start, metric, value in rows}
+    return [
+        {"day": day, **{name: _value(metric, found.get((day, metric))) for name, metric in metrics.items()}}
+        for day in (first + timedelta(days=offset) for offset in range(days))
+    ]
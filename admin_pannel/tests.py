@@ -1,3 +1,85 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from admin_pannel import stats
+from admin_pannel.models import StatsDirtyDay, StatsRollup
+from event.testing import ListingQueryBudgetMixin, login, make_booking, make_event, make_store, make_user
+from user.models import Event, Review
+
+
+@override_settings(LIST_PAGE_SIZE=5)
+class ListingQueryBudgetTests(ListingQueryBudgetMixin, TestCase):
+    """Admin listings cost a fixed number of queries however many rows exist."""
+
+    BUDGETS = {
+        'manage_users': 3,          # + page, COUNT
+        'manage_vendors': 4,        # + tab counts, page, COUNT
+        'admin_manage_events': 2,   # + page
+        'admin_manage_reviews': 2,  # + page
+        'admin_bookings': 3,        # + status counts, page
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('Admin', 'admin', is_active=True)
+        cls.rows = 0
+
+    def setUp(self):
+        login(self.client, self.admin, 'admin')
+
+    def add_rows(self, count):
+        for _ in range(count):
+            n = self.rows = self.rows + 1
+            customer = make_user(f'Customer {n}')
+            store = make_store(make_user(f'Vendor {n}', 'vendor'), f'Store {n}')
+            event = make_event(customer, f'Event {n}')
+            Review.objects.create(user=customer, event=event, rating=5)
+            make_booking(event, store)
+
+    def test_pages_walk_forward_and_back(self):
+        self.add_rows(12)
+
+        url = reverse('admin_manage_events')
+        seen = []
+        response = self.client.get(url)
+        while True:
+            page = response.context['events']
+            seen += [event.id for event in page]
+            if not page.has_next:
+                break
+            response = self.client.get(url + page.next_url)
+        self.assertEqual(seen, list(Event.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+        back = self.client.get(url + page.previous_url).context['events']
+        self.assertEqual([event.id for event in back], seen[5:10])
+
+
+class StatsRollupTests(TestCase):
+    """Dashboard figures come from rollups the rollup_stats command builds (admin_pannel.stats)."""
+
+    def setUp(self):
+        self.customer = make_user('Customer')
+        make_event(self.customer)
+
+    def test_refresh_leaves_the_first_build_to_the_command(self):
+        self.assertFalse(stats.refresh())
+        self.assertFalse(StatsRollup.objects.exists())
+
+        admin = make_user('Admin', 'admin', is_active=True)
+        login(self.client, admin, 'admin')
+        self.assertFalse(self.client.get(reverse('admin_dashboard')).context['stats_ready'])
+
+        call_command('rollup_stats', '--all', stdout=StringIO())
+        self.assertEqual(stats.totals()['events.created'], 1)
+        self.assertFalse(StatsDirtyDay.objects.exists())
+
+    def test_refresh_recomputes_marked_days(self):
+        stats.rebuild()
+        make_event(self.customer, 'Reception')
+        self.assertTrue(StatsDirtyDay.objects.exists())
+        self.assertTrue(stats.refresh())
+        self.assertEqual(stats.totals()['events.created'], 2)
+        self.assertFalse(StatsDirtyDay.objects.exists())
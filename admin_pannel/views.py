@@ -10,6 +10,9 @@ from functools import wraps
 from django.db.models import Sum, Count
 from vendor.models import category, Store, Booking
 
+from admin_pannel import stats
+from event.pagination import paginate
+
 from user.models import Profile, Event, Payment, Review, EventGuestAccess
 
 # 🔐 Admin session decorator
@@ -109,23 +112,18 @@ def admin_view_guest(request, guest_id):
 # 🏠 Admin Dashboard - FIXED VERSION
 @check_admin_session
 def admin_dashboard(request):
-    user_id = request.session.get('user_id')
-    admin = User.objects.filter(id=user_id).first()
+    admin = request.user if request.user.is_authenticated else None
     
     # Calculate date ranges
     last_week = timezone.now() - timedelta(days=7)
     next_week = timezone.now() + timedelta(days=7)
     last_month = timezone.now() - timedelta(days=30)
-    
-    # Get real counts from database
-    total_events = Event.objects.count()
-    new_events_count = Event.objects.filter(created_at__gte=last_week).count()
-    
-    active_vendors = User.objects.filter(role__name__iexact='vendor', is_active=True).count()
-    new_vendors = User.objects.filter(role__name__iexact='vendor', created_at__gte=last_week).count()
-    
-    pending_requests = User.objects.filter(role__name__iexact='vendor', is_active=False).count()
-    
+
+    # Counts and sums come from the materialized rollups (admin_pannel.stats)
+    stats_ready = stats.refresh()
+    totals = stats.totals()
+    recent = stats.since(week=last_week, month=last_month)
+
     upcoming_events = Event.objects.filter(
         date__gte=timezone.now(), 
         date__lte=next_week
@@ -139,34 +137,24 @@ def admin_dashboard(request):
     
     # Get recent users (last 5)
     recent_users = User.objects.filter(role__name__iexact='user').order_by('-created_at')[:5]
-    
-    # Get totals for additional stats - FIXED: Changed 'created_at' to 'payment_date'
-    total_revenue = Payment.objects.filter(status=Payment.STATUS_SUCCESS).aggregate(total=models.Sum('amount'))['total'] or 0
-    
-    # Calculate revenue growth (compare with previous month) - FIXED: Changed 'created_at' to 'payment_date'
-    previous_month_revenue = Payment.objects.filter(
-        status=Payment.STATUS_SUCCESS, 
-        payment_date__lte=last_month
-    ).aggregate(total=models.Sum('amount'))['total'] or 0
-    
+
+    # Calculate revenue growth (compare with revenue up to a month ago)
+    total_revenue = totals['revenue.payments']
+    previous_month_revenue = total_revenue - recent['month']['revenue.payments']
     if previous_month_revenue > 0:
         revenue_growth = round(((total_revenue - previous_month_revenue) / previous_month_revenue) * 100, 1)
     else:
         revenue_growth = 0
-    
-    total_bookings = Booking.objects.count()
-    new_bookings = Booking.objects.filter(created_at__gte=last_week).count()
-    
-    categories_count = category.objects.count()
 
     return render(request, 'admin/dashboard.html', {
         'admin': admin,
+        'stats_ready': stats_ready,
         # Stats cards data
-        'total_events': total_events,
-        'new_events_count': new_events_count,
-        'active_vendors': active_vendors,
-        'new_vendors': new_vendors,
-        'pending_requests': pending_requests,
+        'total_events': totals['events.created'],
+        'new_events_count': recent['week']['events.created'],
+        'active_vendors': totals['vendors.active'],
+        'new_vendors': recent['week']['vendors.joined'],
+        'pending_requests': totals['vendors.pending'],
         'upcoming_events': upcoming_events,
         # Recent data
         'recent_events': recent_events,
@@ -175,18 +163,18 @@ def admin_dashboard(request):
         # Additional stats
         'total_revenue': total_revenue,
         'revenue_growth': revenue_growth,
-        'total_bookings': total_bookings,
-        'new_bookings': new_bookings,
-        'categories_count': categories_count,
+        'total_bookings': totals['bookings.created'],
+        'new_bookings': recent['week']['bookings.created'],
+        'categories_count': totals['categories.total'],
     })
 
 # 👥 Manage Users (Admin Only)
 @check_admin_session
 def manage_users(request):
-    users = User.objects.filter(role__name__iexact='user')
+    users = User.objects.filter(role__name__iexact='user').select_related('role')
 
     return render(request, 'admin/manage_user.html', {
-        'users': users
+        'users': paginate(request, users)
     })
 
 # 👥 Manage Guests (Admin Only) — shows photographer-generated guest credentials
@@ -209,25 +197,36 @@ def manage_guests(request):
 @check_admin_session
 def manage_vendors(request):
     vendors = User.objects.filter(role__name__iexact='vendor')
+    vendor_counts = vendors.aggregate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(is_active=False)),
+        active=Count('id', filter=Q(is_active=True)),
+    )
+
+    status_filter = request.GET.get('status', '')
+    if status_filter in ('active', 'pending'):
+        vendors = vendors.filter(is_active=status_filter == 'active')
 
     return render(request, 'admin/manage_vendor.html', {
-        'vendors': vendors
+        'vendors': paginate(request, vendors),
+        'vendor_counts': vendor_counts,
+        'status_filter': status_filter,
     })
 
 
 @check_admin_session
 def manage_events(request):
-    events = Event.objects.select_related('owner').order_by('-created_at')
+    events = Event.objects.select_related('owner')
     return render(request, 'admin/manage_events.html', {
-        'events': events
+        'events': paginate(request, events)
     })
 
 
 @check_admin_session
 def manage_reviews(request):
-    reviews = Review.objects.select_related('user', 'event').order_by('-created_at')
+    reviews = Review.objects.select_related('user', 'event')
     return render(request, 'admin/manage_reviews.html', {
-        'reviews': reviews
+        'reviews': paginate(request, reviews)
     })
 
 
@@ -242,38 +241,35 @@ def settings_view(request):
 
 @check_admin_session
 def analytics_view(request):
-    total_events   = Event.objects.count()
-    total_reviews  = Review.objects.count()
-    total_vendors  = User.objects.filter(role__name__iexact='vendor').count()
-    total_users    = User.objects.filter(role__name__iexact='user').count()
-    total_bookings = Booking.objects.count()
-    total_revenue  = Booking.objects.filter(status='confirmed').aggregate(s=Sum('amount'))['s'] or 0
-    pending_bookings   = Booking.objects.filter(status='pending').count()
-    confirmed_bookings = Booking.objects.filter(status='confirmed').count()
-    completed_bookings = Booking.objects.filter(status='completed').count()
-    cancelled_bookings = Booking.objects.filter(status='cancelled').count()
-    pending_events   = Event.objects.filter(status='pending').count()
-    confirmed_events = Event.objects.filter(status='confirmed').count()
-    completed_events = Event.objects.filter(status='completed').count()
-    cancelled_events = Event.objects.filter(status='cancelled').count()
+    stats_ready = stats.refresh()
+    totals = stats.totals()
     data = {
-        'total_events': total_events,
-        'total_reviews': total_reviews,
-        'total_vendors': total_vendors,
-        'total_users': total_users,
-        'total_bookings': total_bookings,
-        'total_revenue': total_revenue,
-        'pending_bookings': pending_bookings,
-        'confirmed_bookings': confirmed_bookings,
-        'completed_bookings': completed_bookings,
-        'cancelled_bookings': cancelled_bookings,
-        'pending_events': pending_events,
-        'confirmed_events': confirmed_events,
-        'completed_events': completed_events,
-        'cancelled_events': cancelled_events,
+        'total_events': totals['events.created'],
+        'total_reviews': totals['reviews.created'],
+        'total_vendors': totals['vendors.joined'],
+        'total_users': totals['users.joined'],
+        'total_bookings': totals['bookings.created'],
+        'total_revenue': totals['revenue.bookings'],
     }
+    for status, _label in Booking.STATUS_CHOICES:
+        data[f'{status}_bookings'] = totals[f'bookings.status.{status}']
+    for status, _label in Event.STATUS_CHOICES:
+        data[f'{status}_events'] = totals[f'events.status.{status}']
+
+    # Time series for the charts, straight from the daily rollups
+    revenue_by_day = stats.daily_series(30, revenue='revenue.payments')
+    bookings_by_day = stats.daily_series(
+        14, **{status: f'bookings.status.{status}' for status, _label in Booking.STATUS_CHOICES}
+    )
+    for day in bookings_by_day:
+        day['total'] = sum(day[status] for status, _label in Booking.STATUS_CHOICES)
     return render(request, 'admin/analytics.html', {
-        'data': data
+        'stats_ready': stats_ready,
+        'data': data,
+        'revenue_by_day': revenue_by_day,
+        'revenue_peak': max(day['revenue'] for day in revenue_by_day),
+        'bookings_by_day': bookings_by_day,
+        'bookings_peak': max(day['total'] for day in bookings_by_day),
     })
 
 
@@ -413,7 +409,7 @@ def admin_bookings(request):
     status_filter = request.GET.get('status', '')
     bookings = Booking.objects.select_related(
         'event', 'store', 'customer', 'vendor'
-    ).order_by('-created_at')
+    )
 
     if status_filter:
         bookings = bookings.filter(status=status_filter)
@@ -429,7 +425,7 @@ def admin_bookings(request):
     )
 
     return render(request, 'admin/manage_bookings.html', {
-        'bookings': bookings,
+        'bookings': paginate(request, bookings),
         'status_filter': status_filter,
         'counts': counts,
         'status_choices': Booking.STATUS_CHOICES,
@@ -1,3 +1,98 @@
+"""
+Site-wide template context.
+
+Everything except global_app_info is exposed as a lazy, memoised callable:
+Django templates call it only when a template actually reads the variable,
+so pages that never show a badge never run its query.  Results are cached
+per user (Django cache, CONTEXT_CACHE_TTL seconds) and dropped by the
+invalidate_* helpers below, which are wired to Notification,
+GuestNotification, Store and User writes in the apps' signals modules.
+Code that changes those rows with QuerySet.update() must call the matching
+helper itself.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+CONTEXT_CACHE_TTL = getattr(settings, 'CONTEXT_CACHE_TTL', 300)
+
+ALL_STORES_KEY = 'ctx:all_stores'
+PENDING_VENDORS_KEY = 'ctx:admin_pending_vendors'
+
+
+def _unread_key(user_id):
+    return f'ctx:unread:user:{user_id}'
+
+
+def _guest_unread_key(access_id):
+    return f'ctx:unread:guest:{access_id}'
+
+
+def _photographer_key(vendor_id):
+    return f'ctx:photographer:{vendor_id}'
+
+
+class LazyContextValue:
+    """Callable that computes (through the cache) once, on first template access."""
+
+    def __init__(self, key, compute, default):
+        self._key = key
+        self._compute = compute
+        self._default = default
+        self._resolved = False
+        self._value = None
+
+    def __call__(self):
+        if not self._resolved:
+            self._value = self._load()
+            self._resolved = True
+        return self._value
+
+    def _load(self):
+        value = cache.get(self._key)
+        if value is not None:
+            return value
+        try:
+            value = self._compute()
+        except Exception:
+            # Stay safe if the DB is unavailable.
+            return self._default
+        cache.set(self._key, value, CONTEXT_CACHE_TTL)
+        return value
+
+
+# ---------------------------------------------------------------------------
+# Invalidation hooks
+# ---------------------------------------------------------------------------
+
+def invalidate_unread(user_id=None, guest_access_id=None):
+    if user_id:
+        cache.delete(_unread_key(user_id))
+    if guest_access_id:
+        cache.delete(_guest_unread_key(guest_access_id))
+
+
+def invalidate_unread_many(user_ids=(), guest_access_ids=()):
+    cache.delete_many(
+        [_unread_key(user_id) for user_id in user_ids]
+        + [_guest_unread_key(access_id) for access_id in guest_access_ids]
+    )
+
+
+def invalidate_stores(vendor_id=None):
+    cache.delete(ALL_STORES_KEY)
+    if vendor_id:
+        cache.delete(_photographer_key(vendor_id))
+
+
+def invalidate_pending_vendors():
+    cache.delete(PENDING_VENDORS_KEY)
+
+
+# ---------------------------------------------------------------------------
+# Context processors
+# ---------------------------------------------------------------------------
+
 def global_app_info(request):
     return {
         'APP_NAME': 'Planify.Ai',
@@ -6,48 +101,45 @@ def global_app_info(request):
     }
 
 
+def _active_stores():
+    from vendor.models import Store
+    return list(Store.objects.filter(status=True).order_by('store_name'))
+
+
 def vendor_stores(request):
     """Provide a list of active stores site-wide for templates (safe if DB unavailable)."""
-    try:
-        from vendor.models import Store
-        stores = Store.objects.filter(status=True).order_by('store_name')
-    except Exception:
-        stores = []
     return {
-        'all_stores': stores
+        'all_stores': LazyContextValue(ALL_STORES_KEY, _active_stores, []),
     }
 
 
 def vendor_is_photographer(request):
     """Check if the logged-in vendor has a photographer store."""
-    try:
-        user_id = request.session.get('user_id')
-        role = request.session.get('role')
-        if user_id and role == 'vendor':
-            from vendor.models import Store
-            is_photographer = Store.objects.filter(
-                vendor_id=user_id,
-                category__name__icontains='photographer'
-            ).exists()
-            return {'is_photographer': is_photographer}
-    except Exception:
-        pass
-    return {'is_photographer': False}
+    user_id = request.session.get('user_id')
+    role = request.session.get('role')
+    if not (user_id and role == 'vendor'):
+        return {'is_photographer': False}
+
+    def compute():
+        from vendor.models import Store
+        return Store.objects.filter(
+            vendor_id=user_id,
+            category__name__icontains='photographer'
+        ).exists()
+
+    return {'is_photographer': LazyContextValue(_photographer_key(user_id), compute, False)}
 
 
 def admin_pending_counts(request):
     """Provide pending vendor count for admin sidebar badge."""
-    try:
-        role = request.session.get('role')
-        if role == 'admin':
-            from account.models import User
-            pending_vendors = User.objects.filter(
-                role__name__iexact='vendor', is_active=False
-            ).count()
-            return {'admin_pending_vendors': pending_vendors}
-    except Exception:
-        pass
-    return {'admin_pending_vendors': 0}
+    if request.session.get('role') != 'admin':
+        return {'admin_pending_vendors': 0}
+
+    def compute():
+        from account.models import User
+        return User.objects.filter(role__name__iexact='vendor', is_active=False).count()
+
+    return {'admin_pending_vendors': LazyContextValue(PENDING_VENDORS_KEY, compute, 0)}
 
 
 def unread_counts(request):
@@ -55,33 +147,22 @@ def unread_counts(request):
     Provide unread counters for sidebar badges (safe if DB unavailable).
     Uses session-based login.
     """
-    user_id = None
-    try:
-        user_id = request.session.get('user_id')
-    except Exception:
-        user_id = None
-
-    unread_notifications = 0
-    unread_guest_notifications = 0
-
-    try:
-        if user_id:
-            from user.models import Notification
-            unread_notifications = Notification.objects.filter(user_id=user_id, is_read=False).count()
-    except Exception:
-        unread_notifications = 0
-
-    try:
-        access_id = request.session.get('guest_access_id')
-        if access_id:
-            from user.models import GuestNotification
-            unread_guest_notifications = GuestNotification.objects.filter(
-                guest_access_id=access_id, is_read=False
-            ).count()
-    except Exception:
-        unread_guest_notifications = 0
+    user_id = request.session.get('user_id')
+    access_id = request.session.get('guest_access_id')
+    context = {'unread_notifications': 0, 'unread_guest_notifications': 0}
 
-    return {
-        'unread_notifications': unread_notifications,
-        'unread_guest_notifications': unread_guest_notifications,
-    }
+    if user_id:
+        def count_notifications():
+            from user.unread import notification_count
+            return notification_count(user_id=user_id)
+        context['unread_notifications'] = LazyContextValue(_unread_key(user_id), count_notifications, 0)
+
+    if access_id:
+        def count_guest_notifications():
+            from user.unread import notification_count
+            return notification_count(guest_access_id=access_id)
+        context['unread_guest_notifications'] = LazyContextValue(
+            _guest_unread_key(access_id), count_guest_notifications, 0,
+        )
+
+    return context
@@ -0,0 +1,172 @@
+"""
+Resized derivatives (thumbnail / medium) of uploaded images, stored under
+MEDIA_ROOT/derived/<size>/ and made after upload or on first request.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+SIZES = getattr(settings, "IMAGE_DERIVATIVE_SIZES", {"thumb": 400, "medium": 1600})
+QUALITY = getattr(settings, "IMAGE_DERIVATIVE_QUALITY", 80)
+DERIVED_DIR = "derived"
+
+# (model label, image field) pairs that get derivatives
+SOURCES = [
+    ("vendor.GalleryImage", "image"),
+    ("vendor.StoreImage", "image"),
+    ("vendor.Store", "profile_image"),
+    ("vendor.ChatMessage", "image"),
+    ("account.User", "business_logo"),
+]
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# (name, size) of derivatives known to be on disk, so templates do not stat
+# them on every render; entries are dropped by delete().  Bounded: cleared
+# when it grows past READY_CACHE_SIZE and rebuilt from the next renders.
+READY_CACHE_SIZE = getattr(settings, "IMAGE_DERIVATIVE_READY_CACHE_SIZE", 50000)
+_ready = set()
+
+
+def _format():
+    from PIL import features  # noqa: PLC0415
+
+    if getattr(settings, "IMAGE_DERIVATIVE_FORMAT", "WEBP") == "WEBP" and features.check("webp"):
+        return "WEBP", "webp"
+    return "JPEG", "jpg"
+
+
+def derived_name(name: str, size: str) -> str:
+    """Storage name of the *size* derivative of the original *name*."""
+    return f"{DERIVED_DIR}/{size}/{name}.{_format()[1]}"
+
+
+def derived_path(name: str, size: str) -> str:
+    return os.path.join(settings.MEDIA_ROOT, derived_name(name, size))
+
+
+def _mark_ready(name: str, size: str) -> None:
+    if len(_ready) >= READY_CACHE_SIZE:
+        _ready.clear()
+    _ready.add((name, size))
+
+
+def is_ready(name: str, size: str) -> bool:
+    """Whether the *size* derivative of *name* exists (remembered once seen)."""
+    if (name, size) in _ready:
+        return True
+    if os.path.exists(derived_path(name, size)):
+        _mark_ready(name, size)
+        return True
+    return False
+
+
+def derivative_url(field_file, size: str) -> str:
+    """
+    URL of a derivative of *field_file* (an ImageField value).
+
+    Points straight at the cached file when it exists (see is_ready()),
+    otherwise at the serve_derivative view, which generates it on first
+    request.  Returns '' for an empty field.
+    """
+    if not field_file:
+        return ""
+    name = field_file.name
+    if is_ready(name, size):
+        return settings.MEDIA_URL + derived_name(name, size)
+    return reverse("image_derivative", kwargs={"size": size, "name": name})
+
+
+def generate(name: str, sizes=None) -> list[str]:
+    """Create the missing derivatives of the original *name*; returns those written."""
+    from PIL import Image, ImageOps  # noqa: PLC0415
+
+    source = os.path.join(settings.MEDIA_ROOT, name)
+    written = []
+    todo = [size for size in (sizes or SIZES) if not os.path.exists(derived_path(name, size))]
+    if not todo:
+        return written
+
+    fmt, _ = _format()
+    with Image.open(source) as original:
+        original.draft("RGB", (max(SIZES[size] for size in todo),) * 2)  # fast JPEG downscale on decode
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        if fmt == "JPEG" and image.mode == "RGBA":
+            image = image.convert("RGB")
+
+        for size in sorted(todo, key=lambda s: -SIZES[s]):
+            box = SIZES[size]
+            resized = image.copy()
+            resized.thumbnail((box, box), Image.LANCZOS)
+            target = derived_path(name, size)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+            resized.save(tmp, fmt, quality=QUALITY)
+            os.replace(tmp, target)
+            _mark_ready(name, size)
+            written.append(size)
+    return written
+
+
+def delete(name: str) -> None:
+    """Remove every cached derivative of the original *name*."""
+    for size in SIZES:
+        _ready.discard((name, size))
+        try:
+            os.remove(derived_path(name, size))
+        except FileNotFoundError:
+            pass
+
+
+def _generate_quietly(name: str) -> None:
+    try:
+        generate(name)
+    except Exception as exc:
+        logger.warning("Could not create derivatives for %s: %s", name, exc)
+
+
+def schedule(name: str) -> None:
+    """Generate the derivatives of *name* on the background pool."""
+    global _executor
+    if not getattr(settings, "IMAGE_DERIVATIVES_EAGER", True):
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="derivatives")
+    _executor.submit(_generate_quietly, name)
+
+
+# ---------------------------------------------------------------------------
+# Signal handlers (connected in vendor.signals)
+# ---------------------------------------------------------------------------
+
+def handle_saved(instance, field_name: str) -> None:
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return
+    name = field_file.name
+    if all(is_ready(name, size) for size in SIZES):
+        return
+    transaction.on_commit(lambda: schedule(name))
+
+
+def handle_deleted(instance, field_name: str) -> None:
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return
+    # Deduplicated uploads share one file (vendor.dedupe); keep its
+    # derivatives while any row still uses it.
+    if type(instance)._default_manager.filter(**{field_name: field_file.name}).exists():
+        return
+    delete(field_file.name)
@@ -0,0 +1,180 @@
+"""
+Keyset pagination for listing pages: pages are cut on the listing's sort key
+(ending in the primary key) with ?after= / ?before= cursors, never OFFSET.
+"""
+
+import base64
+import datetime
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+MAX_PER_PAGE = 200
+
+
+def per_page(value=None) -> int:
+    default = getattr(settings, "LIST_PAGE_SIZE", 25)
+    try:
+        return max(1, min(int(value), MAX_PER_PAGE))
+    except (TypeError, ValueError):
+        return default
+
+
+# ---------------------------------------------------------------------------
+# Cursors
+# ---------------------------------------------------------------------------
+
+def _field_names(ordering):
+    return [field.lstrip("-") for field in ordering]
+
+
+def _json_value(value):
+    # full precision: DjangoJSONEncoder would cut datetimes to milliseconds
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(row, ordering) -> str:
+    values = [getattr(row, name) for name in _field_names(ordering)]
+    raw = json.dumps(values, default=_json_value, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def cursor_values(cursor: str, count: int) -> list:
+    """The *count* raw JSON values of a cursor; raises ValueError for anything malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("bad cursor") from exc
+    if not isinstance(values, list) or len(values) != count:
+        raise ValueError("bad cursor")
+    return values
+
+
+def _key_field(queryset, name):
+    annotation = queryset.query.annotations.get(name)
+    if annotation is not None:
+        return annotation.output_field
+    return queryset.model._meta.get_field(name)
+
+
+def decode_cursor(cursor: str, queryset, ordering) -> list:
+    """Key values of a cursor over *queryset*; raises ValueError for anything malformed."""
+    names = _field_names(ordering)
+    values = cursor_values(cursor, len(names))
+    try:
+        return [_key_field(queryset, name).to_python(value) for name, value in zip(names, values)]
+    except (ValidationError, TypeError) as exc:
+        raise ValueError("bad cursor") from exc
+
+
+def _beyond(ordering, values) -> Q:
+    """Rows that sort strictly after *values* under *ordering*."""
+    condition, ties = None, Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        step = ties & Q(**{f"{name}__{'lt' if field.startswith('-') else 'gt'}": value})
+        condition = step if condition is None else condition | step
+        ties &= Q(**{name: value})
+    return condition
+
+
+def _reverse(ordering):
+    return [field[1:] if field.startswith("-") else f"-{field}" for field in ordering]
+
+
+# ---------------------------------------------------------------------------
+# Pages
+# ---------------------------------------------------------------------------
+
+class Page:
+    """One page of rows; iterate it like a list.  See paginate()."""
+
+    def __init__(self, rows, queryset, params, ordering, has_next, has_previous):
+        self.rows = rows
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self._queryset = queryset
+        self._params = params
+        self._ordering = ordering
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __bool__(self):
+        return bool(self.rows)
+
+    def __getitem__(self, index):
+        return self.rows[index]
+
+    @property
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+    @cached_property
+    def total(self) -> int:
+        """Rows across all pages (one COUNT query, on first use)."""
+        return self._queryset.count()
+
+    def _url(self, direction, row) -> str:
+        params = self._params.copy()
+        params.pop("after", None)
+        params.pop("before", None)
+        params[direction] = encode_cursor(row, self._ordering)
+        return f"?{params.urlencode()}"
+
+    @property
+    def next_url(self):
+        return self._url("after", self.rows[-1]) if self.has_next else None
+
+    @property
+    def previous_url(self):
+        return self._url("before", self.rows[0]) if self.has_previous else None
+
+    @property
+    def first_url(self) -> str:
+        params = self._params.copy()
+        params.pop("after", None)
+        params.pop("before", None)
+        return f"?{params.urlencode()}"
+
+
+def paginate(request, queryset, ordering=("-created_at", "-id"), size=None) -> Page:
+    """
+    The page of *queryset* selected by ?after= / ?before= on *request*,
+    sorted by *ordering* (ending with the primary key).  Costs one query
+    (two when the cursor points past the last row).
+    """
+    ordering = list(ordering)
+    size = size or per_page()
+    params = request.GET
+    try:
+        if params.get("before"):
+            values = decode_cursor(params["before"], queryset, ordering)
+            reverse = _reverse(ordering)
+            rows = list(queryset.filter(_beyond(reverse, values)).order_by(*reverse)[:size + 1])
+            if rows:
+                return Page(rows[:size][::-1], queryset, params, ordering,
+                            has_next=True, has_previous=len(rows) > size)
+        elif params.get("after"):
+            values = decode_cursor(params["after"], queryset, ordering)
+            rows = list(queryset.filter(_beyond(ordering, values)).order_by(*ordering)[:size + 1])
+            if rows:
+                return Page(rows[:size], queryset, params, ordering,
+                            has_next=len(rows) > size, has_previous=True)
+    except ValueError:
+        pass
+    # no cursor, a malformed one, or one past the end: the first page
+    rows = list(queryset.order_by(*ordering)[:size + 1])
+    return Page(rows[:size], queryset, params, ordering, has_next=len(rows) > size, has_previous=False)
@@ -0,0 +1,93 @@
+"""
+Minimal publish/subscribe layer for pushing events to open browser streams.
+The backend is settings.PUBSUB_BACKEND; the default InProcessBroker serves a
+single ASGI process.
+"""
+
+import asyncio
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+QUEUE_SIZE = 100
+
+
+class Subscription:
+    """One reader of one channel; iterate with `await subscription.get()`."""
+
+    def __init__(self, broker, channel: str):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def _deliver(self, item) -> None:
+        # runs on self.loop
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(("resync", {}))
+
+    async def get(self, timeout=None):
+        """Next (event, data), or None when *timeout* seconds pass quietly."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}
+
+    def subscribe(self, channel: str) -> Subscription:
+        """Must be called from the event loop that will read the subscription."""
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription) -> None:
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def publish(self, channel: str, event: str, data: dict) -> int:
+        """Send to every current subscriber of *channel*; returns how many."""
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, (event, data))
+            except RuntimeError:
+                # loop already closed; the stream is gone
+                self.unsubscribe(subscription)
+        return len(subscribers)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, "PUBSUB_BACKEND", "event.pubsub.InProcessBroker")
+                _broker = import_string(path)()
+    return _broker
+
+
+def publish(channel: str, event: str, data: dict) -> int:
+    return get_broker().publish(channel, event, data)
@@ -147,3 +147,103 @@ LOGOUT_REDIRECT_URL = 'login'
 import os
 RAZORPAY_KEY_ID = os.getenv('RAZORPAY_KEY_ID', 'rzp_test_Rz5PhSBaGqMF20')
 RAZORPAY_KEY_SECRET = os.getenv('RAZORPAY_KEY_SECRET', 'y57basuht0zdmmdDNmYd5M3p')
+# Webhook signing secret (dashboard > Webhooks); falls back to the key secret
+RAZORPAY_WEBHOOK_SECRET = os.getenv('RAZORPAY_WEBHOOK_SECRET', '')
+
+# Payment gateway client (user.gateway): 'razorpay', or 'fake' for the
+# offline stand-in.  Timeout is (connect, read) seconds.
+PAYMENT_GATEWAY_BACKEND = os.getenv('PAYMENT_GATEWAY_BACKEND', 'razorpay')
+PAYMENT_GATEWAY_TIMEOUT = (3.05, 10)
+PAYMENT_GATEWAY_RETRIES = 3
+PAYMENT_GATEWAY_BACKOFF = 0.3
+PAYMENT_GATEWAY_POOL_SIZE = 10
+FAKE_GATEWAY_LATENCY_MS = 0
+
+# Webhook inbox worker (python manage.py process_webhooks)
+WEBHOOK_MAX_ATTEMPTS = 5
+WEBHOOK_LEASE_SECONDS = 60
+
+# Face search: cap on the number of matched photos returned per selfie search
+FACE_SEARCH_MAX_RESULTS = 500
+
+# Face embedding queue (python manage.py process_embeddings)
+EMBEDDING_MAX_ATTEMPTS = 3
+EMBEDDING_LEASE_SECONDS = 600
+
+# Resident embedding server (python manage.py run_embedding_server).
+# Leave FACE_EMBEDDING_SOCKET empty to embed selfies inside the web worker.
+FACE_EMBEDDING_SOCKET = os.getenv('FACE_EMBEDDING_SOCKET', '')
+FACE_EMBEDDING_TIMEOUT = 10
+FACE_EMBEDDING_LOCAL_FALLBACK = True
+
+# A photo with at least one face, used by the vendor tests to check that batch
+# embedding matches DeepFace.represent (skipped when unset or without DeepFace).
+FACE_EMBEDDING_PARITY_IMAGE = os.getenv('FACE_EMBEDDING_PARITY_IMAGE', '')
+
+# Storage precision for packed face embeddings: 'float32', 'float16' or 'int8'
+FACE_EMBEDDING_DTYPE = 'float32'
+
+# Approximate face search (EventGalleryIndex.search_mode = 'ann').  Events with
+# fewer indexed faces than FACE_ANN_MIN_FACES always use exact search;
+# FACE_ANN_NLIST = None sizes the IVF quantizer automatically (~4 * sqrt(faces)).
+FACE_ANN_MIN_FACES = 20000
+FACE_ANN_NLIST = None
+
+# Chunked, resumable gallery uploads (vendor.gallery_upload)
+GALLERY_UPLOAD_CHUNK_BYTES = 4 * 1024 * 1024
+GALLERY_UPLOAD_MAX_BYTES = 50 * 1024 * 1024
+GALLERY_UPLOAD_EXPIRE_HOURS = 24
+
+# Image derivatives (event.derivatives): longest side in px per size name.
+# Set IMAGE_DERIVATIVES_EAGER = False to only generate them on first request.
+IMAGE_DERIVATIVE_SIZES = {'thumb': 400, 'medium': 1600}
+IMAGE_DERIVATIVE_FORMAT = 'WEBP'
+IMAGE_DERIVATIVE_QUALITY = 80
+IMAGE_DERIVATIVES_EAGER = True
+
+# Guest "download selected" ZIP limits (guest.views.guest_download_photos)
+GUEST_ZIP_MAX_PHOTOS = 500
+GUEST_ZIP_MAX_BYTES = 1024 * 1024 * 1024
+
+# Hash every uploaded file while it streams in (vendor.dedupe)
+FILE_UPLOAD_HANDLERS = [
+    'vendor.dedupe.HashingUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Seconds a session user stays cached by account.user_cache (dropped on save).
+# Only used when USER_CACHE_ALIAS names a cache shared by every process; with
+# the default process-local LocMemCache the user is loaded on each request.
+USER_CACHE_TTL = 60
+USER_CACHE_ALIAS = 'default'
+
+# Seconds the sidebar badges / store list from event.context_processors stay
+# cached (dropped on Notification, Store and User writes)
+CONTEXT_CACHE_TTL = 300
+
+# Messages per page in chat threads (vendor.chat_history)
+CHAT_PAGE_SIZE = 50
+
+# Rows per page on keyset-paginated listings (event.pagination)
+LIST_PAGE_SIZE = 25
+
+# Push channel for chat (event.pubsub / vendor.chat_events).  The in-process
+# broker serves a single ASGI process: uvicorn event.asgi:application
+PUBSUB_BACKEND = 'event.pubsub.InProcessBroker'
+CHAT_SSE_HEARTBEAT = 15
+
+# Notification fan-out (user.notify); jobs are delivered by
+# `manage.py process_notifications`
+NOTIFY_ASYNC = True
+NOTIFY_COALESCE_SECONDS = 30
+NOTIFY_BATCH_SIZE = 500
+NOTIFY_MAX_ATTEMPTS = 5
+NOTIFY_LEASE_SECONDS = 300
+
+# Seconds a vendor's dashboard figures stay cached (vendor.dashboard_stats)
+VENDOR_STATS_TTL = 300
+
+# Days of hourly platform rollups kept for the admin dashboard
+# (admin_pannel.stats; refresh with `manage.py rollup_stats`)
+STATS_HOURLY_RETENTION_DAYS = 35
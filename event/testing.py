@@ -0,0 +1,104 @@
+"""
+Fixtures and checks shared by the apps' tests.
+
+marketplace() builds the usual customer / vendor / store / event / booking
+chain in one call.  ListingQueryBudgetMixin is the query-count check for
+paginated listings: an app's test case lists its BUDGETS and implements
+add_rows().
+"""
+
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from account.models import Role, User
+from user.models import Event
+from vendor.models import Booking, Store, category as Category
+
+
+def role(name):
+    return Role.objects.get_or_create(name=name)[0]
+
+
+def make_user(name, role_name='user', **fields):
+    """A user called *name* with an email derived from it."""
+    slug = name.lower().replace(' ', '.')
+    return User.objects.create(fullname=name, email=f'{slug}@example.com', role=role(role_name), **fields)
+
+
+def make_store(vendor, name='Store', store_category=None, **fields):
+    fields = {'description': '-', 'address': '-', 'city': 'Surat', 'price_start': Decimal('100'), **fields}
+    store_category = store_category or Category.objects.get_or_create(name='Decorator')[0]
+    return Store.objects.create(vendor=vendor, store_name=name, category=store_category, **fields)
+
+
+def make_event(owner, title='Wedding', **fields):
+    fields.setdefault('date', timezone.now())
+    return Event.objects.create(owner=owner, title=title, **fields)
+
+
+def make_booking(event, store, amount=Decimal('100'), **fields):
+    return Booking.objects.create(
+        event=event, store=store, customer=event.owner, vendor=store.vendor, amount=amount, **fields,
+    )
+
+
+def marketplace(event_date=None, **booking_fields):
+    """
+    A customer with an event booked at one vendor's store:
+    SimpleNamespace(customer, vendor, store, event, booking).
+    """
+    customer = make_user('Customer', is_active=True)
+    vendor = make_user('Vendor', 'vendor', is_active=True)
+    store = make_store(vendor)
+    event = make_event(customer, date=event_date or timezone.now())
+    booking = make_booking(event, store, **booking_fields)
+    return SimpleNamespace(customer=customer, vendor=vendor, store=store, event=event, booking=booking)
+
+
+def login(client, user, role_name):
+    """Log *client* in the way account.views does: user id and role in the session."""
+    session = client.session
+    session['user_id'] = user.id
+    session['role'] = role_name
+    session.save()
+
+
+class ListingQueryBudgetMixin:
+    """
+    Listings cost a fixed number of queries however many rows exist.
+
+    Subclasses (of TestCase, under override_settings(LIST_PAGE_SIZE=...))
+    set BUDGETS = {url name: most queries one page may take, the session and
+    user rows included}, log a user in, and implement add_rows(count).
+    QUERY_STRING is appended to every URL (e.g. "?search=photo").
+    """
+
+    BUDGETS = {}
+    QUERY_STRING = ''
+    INITIAL_ROWS = 3
+    ADDED_ROWS = 12
+
+    def add_rows(self, count):
+        raise NotImplementedError
+
+    def queries_for(self, url):
+        self.client.get(url)        # warm the session user and context caches
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(captured)
+
+    def test_listing_pages_stay_within_budget(self):
+        self.add_rows(self.INITIAL_ROWS)
+        small = {name: self.queries_for(reverse(name) + self.QUERY_STRING) for name in self.BUDGETS}
+        self.add_rows(self.ADDED_ROWS)
+        for name, budget in self.BUDGETS.items():
+            with self.subTest(view=name):
+                large = self.queries_for(reverse(name) + self.QUERY_STRING)
+                self.assertLessEqual(large, budget)
+                self.assertEqual(large, small[name], 'query count grew with the table')
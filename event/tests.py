@@ -0,0 +1,148 @@
+import io
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from event import context_processors, derivatives
+from event.testing import make_store, make_user, marketplace
+from event.views import serve_derivative
+from user import unread
+from user.models import EventGuestAccess, GuestNotification, Notification
+from vendor.models import category as Category
+
+
+class ContextCacheInvalidationTests(TestCase):
+    """Cached sidebar values are dropped when their rows change (event.context_processors)."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.world = marketplace()
+
+    def context(self, processor, name, **session):
+        """Resolve *name* from *processor* the way a template would, through the cache."""
+        request = RequestFactory().get('/')
+        request.session = session
+        return processor(request)[name]()
+
+    def unread_badge(self):
+        return self.context(context_processors.unread_counts, 'unread_notifications', user_id=self.world.customer.id)
+
+    def test_unread_badge_follows_notification_writes(self):
+        self.assertEqual(self.unread_badge(), 0)
+        notification = Notification.objects.create(user=self.world.customer, title='Booked', message='-')
+        self.assertEqual(self.unread_badge(), 1)
+
+        unread.mark_notifications_read(user_id=self.world.customer.id)
+        self.assertEqual(self.unread_badge(), 0)
+
+        Notification.objects.create(user=self.world.customer, title='Paid', message='-')
+        notification.refresh_from_db()
+        notification.delete()
+        self.assertEqual(self.unread_badge(), 1)
+
+    def test_guest_badge_follows_notification_writes(self):
+        access = EventGuestAccess.objects.create(
+            event=self.world.event, vendor=self.world.vendor, guest_id='guest-1', password='-',
+        )
+
+        def badge():
+            return self.context(context_processors.unread_counts, 'unread_guest_notifications', guest_access_id=access.id)
+
+        self.assertEqual(badge(), 0)
+        GuestNotification.objects.create(guest_access=access, title='New photos', message='-')
+        self.assertEqual(badge(), 1)
+        unread.bulk_added(guest_access_ids=[access.id])
+        self.assertEqual(badge(), 2)
+
+    def test_store_list_and_photographer_flag_follow_store_writes(self):
+        vendor = self.world.vendor
+
+        def photographer():
+            return self.context(context_processors.vendor_is_photographer, 'is_photographer', user_id=vendor.id, role='vendor')
+
+        def stores():
+            return self.context(context_processors.vendor_stores, 'all_stores')
+
+        self.assertEqual(stores(), [self.world.store])
+        self.assertFalse(photographer())
+
+        studio = make_store(vendor, 'Studio', Category.objects.create(name='Photographer'))
+        self.assertEqual(stores(), [self.world.store, studio])
+        self.assertTrue(photographer())
+
+        self.world.store.status = False
+        self.world.store.save()
+        self.assertEqual(stores(), [studio])
+        studio.delete()
+        self.assertEqual(stores(), [])
+        self.assertFalse(photographer())
+
+    def test_pending_vendor_badge_follows_user_writes(self):
+        def pending():
+            return self.context(context_processors.admin_pending_counts, 'admin_pending_vendors', role='admin')
+
+        self.assertEqual(pending(), 0)
+        applicant = make_user('Applicant', 'vendor', is_active=False)
+        self.assertEqual(pending(), 1)
+        applicant.is_active = True
+        applicant.save()
+        self.assertEqual(pending(), 0)
+
+
+class DerivativeTests(TestCase):
+    """Resized copies are served from disk once made (event.derivatives, event.views)."""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        derivatives._ready.clear()
+        self.addCleanup(derivatives._ready.clear)
+        for name in ('gallery/IMG_1.jpg', 'guest_selfies/me.jpg'):
+            os.makedirs(os.path.join(media, os.path.dirname(name)), exist_ok=True)
+            Image.new('RGB', (800, 600), 'teal').save(os.path.join(media, name), 'JPEG')
+
+    def serve(self, name, size='thumb'):
+        return serve_derivative(RequestFactory().get('/'), size, name)
+
+    def test_first_request_generates_the_derivative(self):
+        response = self.serve('gallery/IMG_1.jpg')
+        with Image.open(io.BytesIO(b''.join(response.streaming_content))) as thumb:
+            self.assertEqual(thumb.size, (400, 300))
+        self.assertTrue(os.path.exists(derivatives.derived_path('gallery/IMG_1.jpg', 'thumb')))
+
+    def test_url_points_at_the_file_once_it_exists(self):
+        field_file = SimpleNamespace(name='gallery/IMG_1.jpg')
+        self.assertEqual(
+            derivatives.derivative_url(field_file, 'thumb'),
+            reverse('image_derivative', kwargs={'size': 'thumb', 'name': 'gallery/IMG_1.jpg'}),
+        )
+        derivatives.generate('gallery/IMG_1.jpg')
+        with mock.patch('os.path.exists') as exists:
+            url = derivatives.derivative_url(field_file, 'thumb')
+        exists.assert_not_called()
+        self.assertEqual(url, settings.MEDIA_URL + derivatives.derived_name('gallery/IMG_1.jpg', 'thumb'))
+
+        derivatives.delete('gallery/IMG_1.jpg')
+        self.assertFalse(derivatives.is_ready('gallery/IMG_1.jpg', 'thumb'))
+
+    def test_refuses_paths_outside_the_source_dirs(self):
+        for name in ('../gallery/IMG_1.jpg', 'gallery/../../etc/passwd', '/gallery/IMG_1.jpg',
+                     'gallery/../guest_selfies/me.jpg', 'guest_selfies/me.jpg', 'gallery/missing.jpg'):
+            with self.subTest(name=name), self.assertRaises(Http404):
+                self.serve(name)
+        self.assertFalse(os.path.exists(os.path.join(settings.MEDIA_ROOT, derivatives.DERIVED_DIR)))
+
+    def test_unknown_size_is_refused(self):
+        with self.assertRaises(Http404):
+            self.serve('gallery/IMG_1.jpg', size='huge')
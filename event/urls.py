@@ -18,6 +18,9 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from django.contrib.staticfiles.urls import staticfiles_urlpatterns
+
+from event.views import serve_derivative
 
 
 urlpatterns = [
@@ -26,8 +29,11 @@ urlpatterns = [
     path('user/', include(("user.urls", "user"), namespace='user')),
     path('vendor/',include('vendor.urls')),
     path('guest/',include('guest.urls')),
+    path('media-derived/<str:size>/<path:name>', serve_derivative, name='image_derivative'),
 ]
 
-# Serve media files in development
+# Serve media and static files in development (runserver serves static on
+# its own; uvicorn, which run_server.bat/.ps1 use, does not)
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += staticfiles_urlpatterns()
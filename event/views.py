@@ -0,0 +1,32 @@
+import mimetypes
+import os
+
+from django.conf import settings
+from django.http import FileResponse, Http404
+from django.views.decorators.http import require_GET
+
+from event import derivatives
+
+# Upload directories whose images may be resized on demand
+DERIVATIVE_SOURCE_DIRS = ('gallery/', 'store_images/', 'chat_images/', 'vendor_logos/')
+
+
+@require_GET
+def serve_derivative(request, size, name):
+    """Generate (once) and serve a resized copy of an uploaded image."""
+    if size not in derivatives.SIZES:
+        raise Http404
+    name = os.path.normpath(name).replace(os.sep, '/')
+    if name.startswith(('/', '..')) or not name.startswith(DERIVATIVE_SOURCE_DIRS):
+        raise Http404
+    if not os.path.isfile(os.path.join(settings.MEDIA_ROOT, name)):
+        raise Http404
+
+    try:
+        derivatives.generate(name, [size])
+    except OSError:
+        raise Http404
+    path = derivatives.derived_path(name, size)
+    response = FileResponse(open(path, 'rb'), content_type=mimetypes.guess_type(path)[0] or 'image/webp')
+    response['Cache-Control'] = 'public, max-age=86400'
+    return response
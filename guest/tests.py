@@ -1,3 +1,125 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+import threading
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.messages import get_messages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from event.testing import make_event, make_user, marketplace
+from guest.views import FACE_MATCHES_SESSION_KEY
+from user.models import EventGuestAccess
+from vendor import embedding_queue, face_index
+from vendor.models import GalleryImage
+
+
+def guest_login(client, access):
+    session = client.session
+    session['guest_access_id'] = access.id
+    session.save()
+
+
+class GuestPhotoTests(TestCase):
+    """Shared setup: a guest of an event whose gallery holds two indexed photos."""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        face_index.clear()
+        self.addCleanup(face_index.clear)
+
+        world = marketplace()
+        self.event = world.event
+        self.access = EventGuestAccess.objects.create(event=world.event, vendor=world.vendor, guest_id='guest-1', password='-')
+        self.photos = []
+        for n, face in enumerate(([1.0, 0.0], [0.0, 1.0])):
+            photo = GalleryImage.objects.create(
+                event=world.event, vendor=world.vendor,
+                image=SimpleUploadedFile(f'photo{n}.jpg', b'jpeg bytes %d' % n),
+            )
+            embedding_queue.store_result(photo, [face])
+            self.photos.append(photo)
+        guest_login(self.client, self.access)
+
+    def search(self, extract):
+        """POST a selfie, with *extract* standing in for extract_selfie_embedding."""
+        selfie = SimpleUploadedFile('selfie.jpg', b'selfie bytes')
+        with mock.patch('vendor.deepface_utils.extract_selfie_embedding', side_effect=extract):
+            return self.client.post(reverse('guest_face_search'), {'selfie': selfie})
+
+
+class GuestFaceSearchTests(GuestPhotoTests):
+    def test_selfie_is_embedded_off_the_request_thread(self):
+        threads = []
+        response = self.search(lambda path: threads.append(threading.get_ident()) or [1.0, 0.0])
+        self.assertTrue(response.context['search_done'])
+        self.assertEqual([item['photo'].id for item in response.context['matched_photos']], [self.photos[0].id])
+        self.assertNotEqual(threads, [threading.get_ident()])
+
+    def test_no_face_in_selfie(self):
+        response = self.search(lambda path: None)
+        self.assertFalse(response.context['search_done'])
+        self.assertIn('No face detected', response.context['error_msg'])
+
+
+class GuestDownloadTests(GuestPhotoTests):
+    def zip_names(self, content):
+        return sorted(zipfile.ZipFile(io.BytesIO(content)).namelist())
+
+    def matched(self, *photos):
+        """Record *photos* as the guest's last face search result."""
+        session = self.client.session
+        session[FACE_MATCHES_SESSION_KEY] = [photo.id for photo in photos]
+        session.save()
+
+    def download(self, *photos):
+        return self.client.post(reverse('guest_download_photos'), {'ids': [photo.id for photo in photos]})
+
+    def refused(self, response, message):
+        self.assertRedirects(response, reverse('guest_face_search'), fetch_redirect_response=False)
+        self.assertIn(message, [str(m) for m in get_messages(response.wsgi_request)])
+
+    async def test_asgi_download_streams_asynchronously(self):
+        await sync_to_async(self.search)(lambda path: [1.0, 0.0])
+        self.async_client.cookies = self.client.cookies
+        response = await self.async_client.post(reverse('guest_download_photos'), {'ids': [self.photos[0].id]})
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(self.zip_names(content), [f'photo_0001_{self.photos[0].id}.jpg'])
+
+    def test_only_photos_the_search_matched_are_served(self):
+        self.search(lambda path: [1.0, 0.0])
+        response = self.download(*self.photos)
+        self.assertEqual(self.zip_names(b''.join(response.streaming_content)), [f'photo_0001_{self.photos[0].id}.jpg'])
+        self.refused(self.download(self.photos[1]), 'None of the selected photos are available.')
+
+    def test_photo_of_another_event_is_refused(self):
+        other = GalleryImage.objects.create(
+            event=make_event(make_user('Other Customer')), image=SimpleUploadedFile('other.jpg', b'other bytes'),
+        )
+        self.matched(other)
+        self.refused(self.download(other), 'None of the selected photos are available.')
+
+    def test_guest_upload_is_refused(self):
+        upload = GalleryImage.objects.create(
+            event=self.event, uploaded_by_guest=True, image=SimpleUploadedFile('guest.jpg', b'guest bytes'),
+        )
+        self.matched(upload)
+        self.refused(self.download(upload), 'None of the selected photos are available.')
+
+    @override_settings(GUEST_ZIP_MAX_PHOTOS=1)
+    def test_photo_count_is_capped(self):
+        self.matched(*self.photos)
+        self.refused(self.download(*self.photos), 'Select between 1 and 1 photos to download.')
+
+    @override_settings(GUEST_ZIP_MAX_BYTES=20)
+    def test_total_size_is_capped(self):
+        self.matched(*self.photos)
+        self.assertEqual(self.download(self.photos[0]).status_code, 200)
+        self.refused(self.download(*self.photos), 'The selected photos total 0 MB; please select under 0 MB per download.')
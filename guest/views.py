@@ -1,8 +1,21 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.db.models import Count, Q
+from django.db.models import Count, Q, F
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.text import slugify
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
 from user.models import Event, EventGuestAccess, GuestNotification, GuestNotificationPreference
-from vendor.models import Booking, GalleryImage, GuestSelfie, Chat, ChatMessage
+from vendor.models import Booking, GalleryImage, GuestSelfie, Chat, ChatMessage, EventGalleryIndex
+from vendor import chat_events, chat_history
+from vendor.deepface_utils import EmbeddingServiceUnavailable
+from guest.zipstream import astream_zip, stream_zip
+from user import unread
+import os
+
+# ids of the photos the guest's last face search matched
+FACE_MATCHES_SESSION_KEY = 'guest_face_matches'
 
 
 def guest_dashboard(request):
@@ -61,7 +74,7 @@ def guest_notifications(request):
         return redirect('login')
 
     notifications = GuestNotification.objects.filter(guest_access=access).order_by('-created_at')[:50]
-    GuestNotification.objects.filter(guest_access=access, is_read=False).update(is_read=True)
+    unread.mark_notifications_read(guest_access_id=access.id)
     gallery_images = GalleryImage.objects.filter(event=access.event).order_by('-uploaded_at')
 
     return render(request, 'guest/notifications.html', {
@@ -105,10 +118,10 @@ def guest_notification_preferences(request):
     })
 
 
-def guest_face_search(request):
+def _face_search_start(request):
     """
-    Guest uploads a selfie; DeepFace extracts its ArcFace embedding and
-    compares it against all photographer-uploaded GalleryImages for the event.
+    The guest's access, the event's index progress and, on POST, the stored
+    selfie (None on GET); or a redirect.
     """
     access_id = request.session.get('guest_access_id')
     if not access_id:
@@ -122,77 +135,150 @@ def guest_face_search(request):
         request.session.flush()
         return redirect('login')
 
-    event = access.event
-    matched_photos = None
-    selfie_url = None
-    search_done = False
-    error_msg = None
+    progress = EventGalleryIndex.peek(access.event_id)
+    if request.method != 'POST':
+        return access, progress, None
+
+    selfie_file = request.FILES.get('selfie')
+    if not selfie_file:
+        messages.error(request, 'Please upload a selfie image.')
+        return redirect('guest_face_search')
+    selfie_obj = GuestSelfie.objects.create(
+        event=access.event,
+        guest_access=access,
+        image=selfie_file,
+    )
+    return access, progress, selfie_obj
+
+
+def _face_search_matches(request, selfie_obj, selfie_embedding, event, progress):
+    from vendor.deepface_utils import find_matching_event_images  # noqa: PLC0415
+
+    selfie_obj.set_face_embeddings([selfie_embedding])
+    selfie_obj.save(update_fields=['face_vectors', 'face_count'])
+
+    # Searches the cached per-event face index (photographer uploads only).
+    # Returns list of (distance, GalleryImage) tuples
+    raw_matches = find_matching_event_images(
+        selfie_embedding,
+        event.id,
+        top_k=getattr(settings, 'FACE_SEARCH_MAX_RESULTS', 500),
+        gallery_index=progress,
+    )
+    # guest_download_photos only serves photos this search showed
+    request.session[FACE_MATCHES_SESSION_KEY] = [img.id for _, img in raw_matches]
+    return [
+        {'photo': img, 'distance': round(dist, 4), 'score': round((1 - dist) * 100, 1)}
+        for dist, img in raw_matches
+    ]
+
+
+def _face_search_page(request, access, progress, **results):
+    gallery_images = GalleryImage.objects.filter(event=access.event).order_by('-uploaded_at')
+    return render(request, 'guest/face_search.html', {
+        'event': access.event,
+        'access': access,
+        'gallery_images': gallery_images,
+        'total_photos': progress.total_photos,
+        'indexed_photos': progress.indexed_photos,
+        **results,
+    })
 
-    if request.method == 'POST':
-        selfie_file = request.FILES.get('selfie')
-        if not selfie_file:
-            messages.error(request, 'Please upload a selfie image.')
-            return redirect('guest_face_search')
-
-        selfie_obj = GuestSelfie.objects.create(
-            event=event,
-            guest_access=access,
-            image=selfie_file,
-        )
-        selfie_url = selfie_obj.image.url
 
+async def guest_face_search(request):
+    """
+    Guest uploads a selfie; DeepFace extracts its ArcFace embedding and
+    compares it against all photographer-uploaded GalleryImages for the event.
+
+    The view is async so the embedding, the slow part, runs on a thread of
+    its own: under ASGI every sync view shares one thread.
+    """
+    start = await sync_to_async(_face_search_start)(request)
+    if isinstance(start, HttpResponse):
+        return start
+    access, progress, selfie_obj = start
+    results = {'matched_photos': None, 'selfie_url': None, 'search_done': False, 'error_msg': None}
+
+    if selfie_obj is not None:
+        results['selfie_url'] = selfie_obj.image.url
         try:
-            from vendor.deepface_utils import (
-                extract_single_embedding,
-                find_matching_gallery_images,
-            )
+            from vendor.deepface_utils import extract_selfie_embedding  # noqa: PLC0415
 
-            selfie_embedding = extract_single_embedding(selfie_obj.image.path)
+            selfie_embedding = await sync_to_async(extract_selfie_embedding, thread_sensitive=False)(
+                selfie_obj.image.path,
+            )
 
             if selfie_embedding is None:
-                error_msg = 'No face detected in your selfie. Please upload a clear, front-facing photo.'
+                results['error_msg'] = 'No face detected in your selfie. Please upload a clear, front-facing photo.'
             else:
-                from vendor.deepface_utils import _safe_tolist
-                selfie_obj.face_embedding = _safe_tolist(selfie_embedding)
-                selfie_obj.save(update_fields=['face_embedding'])
-
-                gallery_qs = GalleryImage.objects.filter(
-                    event=event,
-                    uploaded_by_guest=False,
+                results['matched_photos'] = await sync_to_async(_face_search_matches)(
+                    request, selfie_obj, selfie_embedding, access.event, progress,
                 )
-                # Returns list of (distance, GalleryImage) tuples
-                raw_matches = find_matching_gallery_images(selfie_embedding, gallery_qs)
-                matched_photos = [
-                    {'photo': img, 'distance': round(dist, 4), 'score': round((1 - dist) * 100, 1)}
-                    for dist, img in raw_matches
-                ]
-
-                search_done = True
+                results['search_done'] = True
 
-        except ImportError:
-            error_msg = 'Face recognition service is temporarily unavailable. Please try again later.'
+        except (ImportError, EmbeddingServiceUnavailable):
+            results['error_msg'] = 'Face recognition service is temporarily unavailable. Please try again later.'
         except Exception as exc:
             import logging
             logging.getLogger(__name__).error("Face search error: %s", exc, exc_info=True)
-            error_msg = f'An error occurred during face recognition: {exc}'
+            results['error_msg'] = f'An error occurred during face recognition: {exc}'
 
-    total_photos = GalleryImage.objects.filter(event=event, uploaded_by_guest=False).count()
-    indexed_photos = GalleryImage.objects.filter(
-        event=event, uploaded_by_guest=False, embedding_status='done'
-    ).count()
-    gallery_images = GalleryImage.objects.filter(event=event).order_by('-uploaded_at')
+    return await sync_to_async(_face_search_page)(request, access, progress, **results)
 
-    return render(request, 'guest/face_search.html', {
-        'event': event,
-        'access': access,
-        'gallery_images': gallery_images,
-        'matched_photos': matched_photos,
-        'selfie_url': selfie_url,
-        'search_done': search_done,
-        'error_msg': error_msg,
-        'total_photos': total_photos,
-        'indexed_photos': indexed_photos,
-    })
+
+def guest_download_photos(request):
+    """
+    Stream the selected event photos as one ZIP (POST ids=<GalleryImage id>...).
+
+    Only photos the guest's last face search matched are included, and the
+    total size is capped by GUEST_ZIP_MAX_BYTES / GUEST_ZIP_MAX_PHOTOS.
+    """
+    access = _get_guest_access(request)
+    if not access:
+        messages.error(request, 'Please login to use this feature.')
+        return redirect('login')
+    if request.method != 'POST':
+        return redirect('guest_face_search')
+
+    try:
+        ids = {int(i) for i in request.POST.getlist('ids')}
+    except ValueError:
+        ids = set()
+    max_photos = getattr(settings, 'GUEST_ZIP_MAX_PHOTOS', 500)
+    if not ids or len(ids) > max_photos:
+        messages.error(request, f'Select between 1 and {max_photos} photos to download.')
+        return redirect('guest_face_search')
+
+    ids &= set(request.session.get(FACE_MATCHES_SESSION_KEY, ()))
+    photos = GalleryImage.objects.filter(event=access.event, uploaded_by_guest=False, id__in=ids).order_by('id')
+    entries, total = [], 0
+    for number, photo in enumerate(photos, start=1):
+        try:
+            path = photo.image.path
+            total += os.path.getsize(path)
+        except (OSError, ValueError):
+            continue
+        ext = os.path.splitext(photo.image.name)[1].lower() or '.jpg'
+        entries.append((f'photo_{number:04d}_{photo.id}{ext}', path))
+
+    if not entries:
+        messages.error(request, 'None of the selected photos are available.')
+        return redirect('guest_face_search')
+    max_bytes = getattr(settings, 'GUEST_ZIP_MAX_BYTES', 1024 * 1024 * 1024)
+    if total > max_bytes:
+        messages.error(
+            request,
+            f'The selected photos total {total // (1024 * 1024)} MB; please select under '
+            f'{max_bytes // (1024 * 1024)} MB per download.',
+        )
+        return redirect('guest_face_search')
+
+    # under ASGI an async iterator, so the archive is not buffered on the sync thread
+    chunks = astream_zip(entries) if isinstance(request, ASGIRequest) else stream_zip(entries)
+    response = StreamingHttpResponse(chunks, content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{slugify(access.event.title) or "event"}_my_photos.zip"'
+    response['Cache-Control'] = 'no-store'
+    return response
 
 
 def guest_chat(request):
@@ -203,8 +289,8 @@ def guest_chat(request):
         return redirect('login')
 
     chats = Chat.objects.filter(guest_access=access).select_related('vendor', 'store').annotate(
-        unread_count=Count('messages', filter=Q(messages__is_read=False))
-    )
+        unread_count=F('customer_unread')
+    ).order_by('-last_activity_at')
 
     return render(request, 'guest/chat.html', {
         'event': access.event,
@@ -232,24 +318,43 @@ def guest_chat_detail(request, chat_id):
                 guest_sender=access,
                 message=message_text or '',
                 image=image,
-                is_read=True,  # Own message, no unread badge for guest
             )
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            return JsonResponse({'sent': bool(message_text or image)}, status=201)
         return redirect('guest_chat_detail', chat_id=chat.id)
 
     # Mark vendor's messages as read
-    chat.messages.filter(is_read=False).filter(sender_id=chat.vendor_id).update(is_read=True)
-
-    messages_qs = chat.messages.select_related('sender', 'guest_sender', 'guest_sender__event').all()
+    unread.mark_chat_read(chat, by_vendor=False)
 
     return render(request, 'guest/chat_detail.html', {
         'event': access.event,
         'access': access,
         'chat': chat,
-        'messages': messages_qs,
+        'page': chat_history.latest(chat),
         'gallery_images': GalleryImage.objects.filter(event=access.event).order_by('-uploaded_at'),
     })
 
 
+def guest_chat_messages(request, chat_id):
+    """JSON: messages before/after a cursor (see vendor.chat_history)."""
+    access = _get_guest_access(request)
+    if not access:
+        return JsonResponse({'error': 'Please login to access chat.'}, status=401)
+    chat = get_object_or_404(Chat, id=chat_id, guest_access=access)
+    return chat_history.json_response(
+        request, chat, 'guest/include/chat_message.html', {'access': access}, by_vendor=False,
+    )
+
+
+def guest_chat_events(request, chat_id):
+    """Server-Sent Events stream of one chat (see vendor.chat_events)."""
+    access = _get_guest_access(request)
+    if not access:
+        return HttpResponse(status=204)
+    chat = get_object_or_404(Chat, id=chat_id, guest_access=access)
+    return chat_events.stream_response(request, chat)
+
+
 def guest_start_chat(request):
     """Create or open chat with the event's vendor."""
     access = _get_guest_access(request)
@@ -0,0 +1,61 @@
+"""
+Constant-memory ZIP streaming for photo downloads.
+"""
+
+import zipfile
+
+from asgiref.sync import sync_to_async
+
+CHUNK_BYTES = 256 * 1024
+
+
+class _Sink:
+    """Write-only, unseekable buffer that zipfile writes into."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def stream_zip(entries, chunk_bytes: int = CHUNK_BYTES):
+    """
+    Yield the bytes of a ZIP archive of *entries*, an iterable of
+    (archive_name, file_path) pairs.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for arcname, path in entries:
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = zipfile.ZIP_STORED
+            with open(path, "rb") as src, archive.open(info, mode="w", force_zip64=info.file_size > 0x7FFFFFFF) as dest:
+                while True:
+                    block = src.read(chunk_bytes)
+                    if not block:
+                        break
+                    dest.write(block)
+                    yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
+
+async def astream_zip(entries, chunk_bytes: int = CHUNK_BYTES):
+    """
+    stream_zip() for ASGI responses.  Each chunk is read on a worker thread
+    of its own, so a large download holds neither the event loop nor the
+    thread Django runs sync views on.
+    """
+    chunks = stream_zip(entries, chunk_bytes)
+    next_chunk = sync_to_async(next, thread_sensitive=False)
+    while (chunk := await next_chunk(chunks, None)) is not None:
+        yield chunk
@@ -1,3 +1,4 @@
 pip install google-auth
 pip install django-allauth
-pip install razorpay
\ No newline at end of file
+pip install razorpay
+pip install uvicorn
@@ -1,10 +1,19 @@
 @echo off
-echo Starting Django Development Server...
+echo Starting Django server and background workers...
 echo.
 cd /d "%~dp0"
-start "Django Server" cmd /k "python manage.py runserver"
+rem The web app runs under uvicorn (ASGI): chat streams push through the
+rem in-process broker (event.pubsub), so it must stay a single process.
+start "Django Server" cmd /k "python -m uvicorn event.asgi:application --host 127.0.0.1 --port 8000"
+rem Queue workers: payment webhooks (user.webhooks), face embeddings
+rem (vendor.embedding_queue) and notification fan-out (user.notify).
+start "Webhook Worker" cmd /k "python manage.py process_webhooks"
+start "Embedding Worker" cmd /k "python manage.py process_embeddings"
+start "Notification Worker" cmd /k "python manage.py process_notifications"
 timeout /t 3 /nobreak >nul
 start msedge http://127.0.0.1:8000
 echo.
-echo Server is running! Press any key to stop the server...
+echo Server and workers are running in their own windows.
+echo Admin statistics are built by "python manage.py rollup_stats" (run it with --all once).
+echo Press any key to close this window (server and workers keep running)...
 pause
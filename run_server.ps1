@@ -1,12 +1,24 @@
-# PowerShell script to start Django server and open Edge
-Write-Host "Starting Django Development Server..." -ForegroundColor Green
+# PowerShell script to start the Django server, its background workers and Edge
+Write-Host "Starting Django server and background workers..." -ForegroundColor Green
 Write-Host ""
 
 # Change to script directory
 Set-Location $PSScriptRoot
 
-# Start Django server in background
-Start-Process powershell -ArgumentList "-NoExit", "-Command", "cd '$PSScriptRoot'; python manage.py runserver" -WindowStyle Normal
+# Each process gets its own window
+function Start-Window($command) {
+    Start-Process powershell -ArgumentList "-NoExit", "-Command", "cd '$PSScriptRoot'; $command" -WindowStyle Normal
+}
+
+# The web app runs under uvicorn (ASGI): chat streams push through the
+# in-process broker (event.pubsub), so it must stay a single process.
+Start-Window "python -m uvicorn event.asgi:application --host 127.0.0.1 --port 8000"
+
+# Queue workers: payment webhooks (user.webhooks), face embeddings
+# (vendor.embedding_queue) and notification fan-out (user.notify)
+Start-Window "python manage.py process_webhooks"
+Start-Window "python manage.py process_embeddings"
+Start-Window "python manage.py process_notifications"
 
 # Wait a moment for server to start
 Start-Sleep -Seconds 3
@@ -15,8 +27,9 @@ Start-Sleep -Seconds 3
 Start-Process "msedge.exe" -ArgumentList "http://127.0.0.1:8000"
 
 Write-Host ""
-Write-Host "Server is running in a separate window!" -ForegroundColor Green
+Write-Host "Server and workers are running in separate windows!" -ForegroundColor Green
 Write-Host "Edge browser should open automatically." -ForegroundColor Green
+Write-Host "Admin statistics are built by 'python manage.py rollup_stats' (run it with --all once)." -ForegroundColor Green
 Write-Host ""
-Write-Host "Press any key to exit this script (server will continue running)..." -ForegroundColor Yellow
+Write-Host "Press any key to exit this script (server and workers will continue running)..." -ForegroundColor Yellow
 $null = $Host.UI.RawUI.ReadKey("NoEcho,IncludeKeyDown")
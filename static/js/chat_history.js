@@ -0,0 +1,144 @@
+/*
+ * Incremental chat history for the vendor / user / guest chat pages.
+ *
+ * The page renders the latest messages; #chatBody carries the JSON endpoint
+ * and the keyset cursors (vendor.chat_history).  Older messages are fetched
+ * when the reader scrolls to the top, and sending a message posts the form
+ * in the background and then fetches everything newer than the last message
+ * shown, instead of reloading the whole thread.
+ *
+ * New messages, read receipts and deletions arrive over the chat's
+ * Server-Sent Events stream (vendor.chat_events); without one (WSGI server,
+ * old browser) the page polls for newer messages instead.
+ */
+(function () {
+    function getCookie(name) {
+        const v = document.cookie.match('(^|;)\\s*' + name + '\\s*=\\s*([^;]+)');
+        return v ? v.pop() : '';
+    }
+
+    function init() {
+        const body = document.getElementById('chatBody');
+        const list = document.getElementById('messagesContainer');
+        if (!body || !list || !body.dataset.historyUrl) return;
+
+        const url = body.dataset.historyUrl;
+        let olderCursor = body.dataset.olderCursor;
+        let newerCursor = body.dataset.newerCursor;
+        let hasOlder = body.dataset.hasOlder === '1';
+        let loadingOlder = false;
+        let fetchingNewer = null;
+
+        const olderBtn = document.createElement('button');
+        olderBtn.type = 'button';
+        olderBtn.className = 'btn btn-sm btn-link align-self-center';
+        olderBtn.textContent = 'Load earlier messages';
+        body.insertBefore(olderBtn, list);
+
+        const seen = document.createElement('div');
+        seen.className = 'small text-muted align-self-end';
+        seen.style.display = 'none';
+        seen.innerHTML = '<i class="bi bi-check2-all"></i> Seen';
+        body.appendChild(seen);
+
+        function syncOlderBtn() { olderBtn.style.display = hasOlder ? '' : 'none'; }
+
+        function get(params) {
+            return fetch(url + '?' + new URLSearchParams(params), {
+                headers: { 'Accept': 'application/json', 'X-Requested-With': 'XMLHttpRequest' },
+                credentials: 'same-origin'
+            }).then(r => { if (!r.ok) throw new Error('HTTP ' + r.status); return r.json(); });
+        }
+
+        function insert(html, atTop) {
+            if (!html) return;
+            const empty = list.querySelector('.chat-empty');
+            if (empty) empty.remove();
+            const tpl = document.createElement('template');
+            tpl.innerHTML = html;
+            // skip rows already on the page (e.g. a message that arrived twice)
+            tpl.content.querySelectorAll('[data-message-id]').forEach(el => {
+                if (list.querySelector('[data-message-id="' + el.dataset.messageId + '"]')) el.remove();
+            });
+            if (atTop) list.insertBefore(tpl.content, list.firstChild);
+            else { list.appendChild(tpl.content); seen.style.display = 'none'; }
+        }
+
+        function loadOlder() {
+            if (!hasOlder || loadingOlder || !olderCursor) return;
+            loadingOlder = true;
+            const fromBottom = body.scrollHeight - body.scrollTop;
+            get({ before: olderCursor }).then(data => {
+                insert(data.html, true);
+                if (data.older_cursor) olderCursor = data.older_cursor;
+                hasOlder = data.has_older;
+                body.scrollTop = body.scrollHeight - fromBottom;   // keep the reader's place
+            }).catch(() => {}).finally(() => { loadingOlder = false; syncOlderBtn(); });
+        }
+
+        function fetchNewer() {
+            if (fetchingNewer) return fetchingNewer;
+            const step = () => get({ after: newerCursor }).then(data => {
+                const atBottom = body.scrollHeight - body.scrollTop - body.clientHeight < 80;
+                insert(data.html, false);
+                newerCursor = data.newer_cursor;
+                if (data.count && atBottom) body.scrollTop = body.scrollHeight;
+                if (data.has_newer) return step();
+            });
+            fetchingNewer = step().catch(() => {}).finally(() => { fetchingNewer = null; });
+            return fetchingNewer;
+        }
+        window.chatFetchNewer = fetchNewer;
+
+        function poll() { setInterval(() => { if (!document.hidden) fetchNewer(); }, 10000); }
+
+        if (body.dataset.eventsUrl && window.EventSource) {
+            const source = new EventSource(body.dataset.eventsUrl);
+            ['ready', 'message', 'resync'].forEach(name => source.addEventListener(name, fetchNewer));
+            source.addEventListener('deleted', ev => {
+                const el = list.querySelector('[data-message-id="' + JSON.parse(ev.data).id + '"]');
+                if (el) el.remove();
+            });
+            source.addEventListener('read', ev => {
+                if (JSON.parse(ev.data).reader !== body.dataset.viewer) seen.style.display = '';
+            });
+            source.addEventListener('error', () => {
+                // closed for good (e.g. 204 from a WSGI server): poll instead
+                if (source.readyState === EventSource.CLOSED) poll();
+            });
+        } else {
+            poll();
+        }
+
+        olderBtn.addEventListener('click', loadOlder);
+        body.addEventListener('scroll', () => { if (body.scrollTop < 40) loadOlder(); });
+        syncOlderBtn();
+
+        const form = document.getElementById('sendMessageForm');
+        if (form) {
+            form.addEventListener('submit', function (ev) {
+                ev.preventDefault();
+                const data = new FormData(form);
+                if (!String(data.get('message') || '').trim() && !(form.image && form.image.files.length)) return;
+                const sendBtn = form.querySelector('[type="submit"]');
+                if (sendBtn) sendBtn.disabled = true;
+                fetch(form.action || window.location.href, {
+                    method: 'POST',
+                    body: data,
+                    headers: { 'X-Requested-With': 'XMLHttpRequest', 'X-CSRFToken': getCookie('csrftoken') },
+                    credentials: 'same-origin'
+                }).then(r => {
+                    if (!r.ok) throw new Error('HTTP ' + r.status);
+                    form.reset();
+                    const remove = document.getElementById('removeImageBtn');
+                    if (remove) remove.click();
+                    body.scrollTop = body.scrollHeight;
+                    return fetchNewer();
+                }).catch(() => { alert('Could not send message'); })
+                  .finally(() => { if (sendBtn) sendBtn.disabled = false; });
+            });
+        }
+    }
+
+    document.addEventListener('DOMContentLoaded', init);
+})();
@@ -0,0 +1,190 @@
+"""
+Payment gateway client: one pooled Razorpay client per process, or the
+in-memory FakeGateway when PAYMENT_GATEWAY_BACKEND = "fake".
+"""
+
+import secrets
+import threading
+import time
+
+from django.conf import settings
+
+TIMEOUT = getattr(settings, "PAYMENT_GATEWAY_TIMEOUT", (3.05, 10))
+RETRIES = getattr(settings, "PAYMENT_GATEWAY_RETRIES", 3)
+BACKOFF = getattr(settings, "PAYMENT_GATEWAY_BACKOFF", 0.3)
+POOL_SIZE = getattr(settings, "PAYMENT_GATEWAY_POOL_SIZE", 10)
+FAKE_LATENCY_MS = getattr(settings, "FAKE_GATEWAY_LATENCY_MS", 0)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_client = None
+_lock = threading.Lock()
+
+
+class GatewayError(Exception):
+    """The gateway could not be reached or refused the request."""
+
+
+# ---------------------------------------------------------------------------
+# Razorpay
+# ---------------------------------------------------------------------------
+
+class RazorpayGateway:
+    name = "razorpay"
+
+    def __init__(self, key_id, key_secret, timeout=TIMEOUT, retries=RETRIES, backoff=BACKOFF, pool_size=POOL_SIZE):
+        try:
+            import razorpay  # noqa: PLC0415
+            import requests  # noqa: PLC0415
+            from requests.adapters import HTTPAdapter  # noqa: PLC0415
+            from urllib3.util.retry import Retry  # noqa: PLC0415
+        except ImportError as exc:
+            raise GatewayError("razorpay library missing") from exc
+
+        class TimeoutSession(requests.Session):
+            def request(self, *args, **kwargs):
+                kwargs.setdefault("timeout", timeout)
+                return super().request(*args, **kwargs)
+
+        retry = Retry(
+            total=retries, connect=retries, read=retries, status=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET"}),     # read/status retries only for idempotent fetches
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = TimeoutSession()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+        self.key_id = key_id
+        self._client = razorpay.Client(session=session, auth=(key_id, key_secret))
+
+    def create_order(self, amount_paise: int, currency: str = "INR", receipt: str = "") -> dict:
+        try:
+            return self._client.order.create({
+                "amount": amount_paise, "currency": currency, "receipt": receipt, "payment_capture": 1,
+            })
+        except Exception as exc:
+            raise GatewayError(f"order create failed: {exc}") from exc
+
+    def fetch_payment(self, payment_id: str) -> dict:
+        try:
+            return self._client.payment.fetch(payment_id)
+        except Exception as exc:
+            raise GatewayError(f"payment fetch failed: {exc}") from exc
+
+
+# ---------------------------------------------------------------------------
+# Local stand-in
+# ---------------------------------------------------------------------------
+
+class FakeGateway:
+    """In-memory orders and payments shaped like Razorpay's API entities."""
+
+    name = "fake"
+    key_id = "rzp_test_fake"
+
+    def __init__(self, latency_ms=FAKE_LATENCY_MS):
+        self._latency = latency_ms / 1000
+        self._lock = threading.Lock()
+        self._orders = {}
+        self._payments = {}
+
+    def _round_trip(self):
+        if self._latency:
+            time.sleep(self._latency)
+
+    @staticmethod
+    def _new_id(prefix: str) -> str:
+        return f"{prefix}_{secrets.token_hex(7)}"
+
+    def create_order(self, amount_paise: int, currency: str = "INR", receipt: str = "") -> dict:
+        self._round_trip()
+        if not isinstance(amount_paise, int) or amount_paise < 100:
+            raise GatewayError("order create failed: amount must be an integer of at least 100 paise")
+        order = {
+            "id": self._new_id("order"), "entity": "order",
+            "amount": amount_paise, "amount_paid": 0, "amount_due": amount_paise,
+            "currency": currency, "receipt": receipt, "status": "created", "attempts": 0,
+            "created_at": int(time.time()),
+        }
+        with self._lock:
+            self._orders[order["id"]] = order
+        return dict(order)
+
+    def pay(self, order_id: str, status: str = "captured", method: str = "upi") -> dict:
+        """Simulate the customer paying *order_id*; returns the payment entity."""
+        self._round_trip()
+        with self._lock:
+            order = self._orders.get(order_id)
+            if order is None:
+                raise GatewayError(f"order {order_id} not found")
+            payment = {
+                "id": self._new_id("pay"), "entity": "payment",
+                "amount": order["amount"], "currency": order["currency"],
+                "status": status, "order_id": order_id, "method": method,
+                "captured": status == "captured", "created_at": int(time.time()),
+            }
+            self._payments[payment["id"]] = payment
+            order["attempts"] += 1
+            if status == "captured":
+                order.update(status="paid", amount_paid=order["amount"], amount_due=0)
+            else:
+                order["status"] = "attempted"
+        return dict(payment)
+
+    def fetch_payment(self, payment_id: str) -> dict:
+        self._round_trip()
+        with self._lock:
+            payment = self._payments.get(payment_id)
+        if payment is None:
+            raise GatewayError(f"payment fetch failed: {payment_id} not found")
+        return dict(payment)
+
+    @staticmethod
+    def webhook_event(payment: dict) -> dict:
+        """The webhook body Razorpay would send for *payment*."""
+        return {
+            "entity": "event",
+            "event": f"payment.{payment['status']}",
+            "payload": {"payment": {"entity": payment}},
+            "created_at": payment["created_at"],
+        }
+
+
+# ---------------------------------------------------------------------------
+# Process-wide client
+# ---------------------------------------------------------------------------
+
+def backend_name() -> str:
+    return getattr(settings, "PAYMENT_GATEWAY_BACKEND", "razorpay")
+
+
+def _build():
+    backend = backend_name()
+    if backend == "fake":
+        return FakeGateway()
+    if backend == "razorpay":
+        return RazorpayGateway(
+            getattr(settings, "RAZORPAY_KEY_ID", ""), getattr(settings, "RAZORPAY_KEY_SECRET", ""),
+        )
+    raise GatewayError(f"unknown PAYMENT_GATEWAY_BACKEND {backend!r}")
+
+
+def client():
+    """The process-wide gateway client (built on first use); raises GatewayError."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = _build()
+    return _client
+
+
+def reset() -> None:
+    """Drop the process-wide client; the next client() builds a new one (after a settings change)."""
+    global _client
+    with _lock:
+        _client = None
@@ -0,0 +1,149 @@
+"""
+A customer's payment history: event payments and booking advances in one
+keyset-paginated feed, built as a UNION ALL of the two tables.
+"""
+
+from collections import namedtuple
+
+from django.db.models import CharField, Count, F, Q, Value
+from django.utils.dateparse import parse_datetime
+
+from event.pagination import Page, cursor_values, per_page
+from user.models import Payment
+from vendor.models import AdvancePayment
+
+SUCCEEDED, FAILED, PENDING = "succeeded", "failed", "pending"
+
+ORDERING = ("-when", "-kind", "-id")
+
+Entry = namedtuple("Entry", "kind id amount status when gateway title store_name")
+
+# ledger status -> (Payment status, AdvancePayment status)
+_STATUSES = {
+    SUCCEEDED: (Payment.STATUS_SUCCESS, AdvancePayment.STATUS_SUCCEEDED),
+    FAILED: (Payment.STATUS_FAILED, AdvancePayment.STATUS_FAILED),
+    PENDING: (Payment.STATUS_PENDING, AdvancePayment.STATUS_PENDING),
+}
+
+# arms in _STATUSES tuple order: model, its date field, its kind
+_ARMS = (
+    (Payment, "payment_date", "payment"),
+    (AdvancePayment, "created_at", "advance"),
+)
+
+
+# ---------------------------------------------------------------------------
+# Query
+# ---------------------------------------------------------------------------
+
+def _arm_after(date_field, kind, cursor) -> Q:
+    """Rows of one arm that sort after *cursor* = (when, kind, id)."""
+    when, cursor_kind, cursor_id = cursor
+    if kind < cursor_kind:
+        return Q(**{f"{date_field}__lte": when})
+    if kind > cursor_kind:
+        return Q(**{f"{date_field}__lt": when})
+    return Q(**{f"{date_field}__lt": when}) | Q(**{date_field: when, "id__lt": cursor_id})
+
+
+def _arm_before(date_field, kind, cursor) -> Q:
+    """Rows of one arm that sort before *cursor*."""
+    when, cursor_kind, cursor_id = cursor
+    if kind > cursor_kind:
+        return Q(**{f"{date_field}__gte": when})
+    if kind < cursor_kind:
+        return Q(**{f"{date_field}__gt": when})
+    return Q(**{f"{date_field}__gt": when}) | Q(**{date_field: when, "id__gt": cursor_id})
+
+
+def _arm(index, user, status, condition):
+    model, date_field, kind = _ARMS[index]
+    rows = model.objects.filter(user=user)
+    if status:
+        rows = rows.filter(status=_STATUSES[status][index])
+    if condition is not None:
+        rows = rows.filter(condition)
+    if model is Payment:
+        extra = {
+            "gateway_name": Value("", output_field=CharField()),
+            "title": F("event__title"),
+            "store": Value(None, output_field=CharField()),
+        }
+    else:
+        extra = {
+            "gateway_name": F("gateway"),
+            "title": F("booking__event__title"),
+            "store": F("booking__store__store_name"),
+        }
+    return (
+        rows.annotate(kind=Value(kind, output_field=CharField()), when=F(date_field), **extra)
+        .values_list("kind", "id", "amount", "status", "when", "gateway_name", "title", "store")
+    )
+
+
+def entries(user, status=None, after=None, before=None):
+    """
+    The UNION ALL queryset of *user*'s ledger rows (tuples in Entry order),
+    optionally only *status* and only those after / before a cursor key.
+    """
+    arms = []
+    for index, (_, date_field, kind) in enumerate(_ARMS):
+        condition = None
+        if after is not None:
+            condition = _arm_after(date_field, kind, after)
+        elif before is not None:
+            condition = _arm_before(date_field, kind, before)
+        arms.append(_arm(index, user, status, condition))
+    return arms[0].union(*arms[1:], all=True)
+
+
+def _decode(cursor):
+    when, kind, entry_id = cursor_values(cursor, 3)
+    when = parse_datetime(when) if isinstance(when, str) else None
+    if when is None or kind not in {arm[2] for arm in _ARMS} or not isinstance(entry_id, int):
+        raise ValueError("bad cursor")
+    return when, kind, entry_id
+
+
+def page(request, user, status=None, size=None) -> Page:
+    """
+    One page of *user*'s ledger selected by ?after= / ?before=, newest first;
+    a malformed or exhausted cursor shows the first page.  One query.
+    """
+    size = size or per_page()
+    params = request.GET
+    reverse = [field.lstrip("-") for field in ORDERING]
+    try:
+        if params.get("before"):
+            rows = entries(user, status, before=_decode(params["before"])).order_by(*reverse)[:size + 1]
+            rows = [Entry._make(row) for row in rows]
+            if rows:
+                return Page(rows[:size][::-1], entries(user, status), params, ORDERING,
+                            has_next=True, has_previous=len(rows) > size)
+        elif params.get("after"):
+            rows = entries(user, status, after=_decode(params["after"])).order_by(*ORDERING)[:size + 1]
+            rows = [Entry._make(row) for row in rows]
+            if rows:
+                return Page(rows[:size], entries(user, status), params, ORDERING,
+                            has_next=len(rows) > size, has_previous=True)
+    except ValueError:
+        pass
+    rows = [Entry._make(row) for row in entries(user, status).order_by(*ORDERING)[:size + 1]]
+    return Page(rows[:size], entries(user, status), params, ORDERING, has_next=len(rows) > size, has_previous=False)
+
+
+# ---------------------------------------------------------------------------
+# Counts
+# ---------------------------------------------------------------------------
+
+def summary(user) -> dict:
+    """{"total", "succeeded", "failed", "pending"} across both tables."""
+    result = dict.fromkeys(("total", SUCCEEDED, FAILED, PENDING), 0)
+    for index, (model, _, _) in enumerate(_ARMS):
+        counts = model.objects.filter(user=user).aggregate(
+            total=Count("id"),
+            **{name: Count("id", filter=Q(status=statuses[index])) for name, statuses in _STATUSES.items()},
+        )
+        for name, count in counts.items():
+            result[name] += count
+    return result
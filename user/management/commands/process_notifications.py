@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from user import notify
+
+
+class Command(BaseCommand):
+    help = "Run the notification worker: deliver due NotificationJob rows (user.notify)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Jobs claimed per batch.')
+        parser.add_argument('--max-attempts', type=int, default=notify.MAX_ATTEMPTS,
+                            help='Give up on a job after this many failed attempts.')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to sleep when no job is due.')
+        parser.add_argument('--once', action='store_true', help='Deliver the due jobs once and exit.')
+        parser.add_argument('--requeue-failed', action='store_true',
+                            help='Give failed jobs a fresh set of attempts before starting.')
+
+    def handle(self, *args, **options):
+        if options['requeue_failed']:
+            self.stdout.write(f'Requeued {notify.requeue_failed()} failed job(s)')
+
+        processed = 0
+        while True:
+            done = notify.process_pending(options['batch_size'], options['max_attempts'])
+            processed += done
+            if done:
+                self.stdout.write(f'Processed {processed} job(s); {notify.pending_count(options["max_attempts"])} due')
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Done: {processed} job(s) processed'))
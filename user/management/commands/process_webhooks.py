@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from user import webhooks
+
+
+class Command(BaseCommand):
+    help = "Run the payment webhook worker: apply stored WebhookEvent rows (user.webhooks)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Inbox rows claimed per batch.')
+        parser.add_argument('--max-attempts', type=int, default=webhooks.MAX_ATTEMPTS,
+                            help='Give up on an event after this many failed attempts.')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to sleep when the inbox is empty.')
+        parser.add_argument('--once', action='store_true', help='Drain the inbox once and exit.')
+        parser.add_argument('--requeue-failed', action='store_true',
+                            help='Reset failed events to pending (fresh attempts) before starting.')
+
+    def handle(self, *args, **options):
+        if options['requeue_failed']:
+            self.stdout.write(f'Requeued {webhooks.requeue_failed()} failed event(s)')
+
+        processed = 0
+        while True:
+            done = webhooks.process_pending(options['batch_size'], options['max_attempts'])
+            processed += done
+            if done:
+                self.stdout.write(f'Processed {processed} event(s); {webhooks.pending_count(options["max_attempts"])} queued')
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Done: {processed} event(s) processed'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from user import unread
+
+
+class Command(BaseCommand):
+    help = "Recompute the maintained unread counters (notifications and chats) from the underlying rows."
+
+    def handle(self, *args, **options):
+        fixed = unread.repair_all()
+        self.stdout.write(self.style.SUCCESS(
+            f"Repaired {fixed['users']} user, {fixed['guests']} guest and {fixed['chats']} chat counter(s)"
+        ))
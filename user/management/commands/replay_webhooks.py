@@ -0,0 +1,81 @@
+import hashlib
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from user import webhooks
+from user.models import WebhookEvent
+
+
+class Command(BaseCommand):
+    help = (
+        "Stand in for the payment gateway: sign recorded webhook payloads and POST them "
+        "to a webhook endpoint concurrently, each several times, like gateway retries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', nargs='?', help='JSON-lines file with one webhook body per line.')
+        parser.add_argument('--from-inbox', type=int, metavar='N',
+                            help='Replay the N most recent payloads stored in the webhook inbox instead.')
+        parser.add_argument('--url', default='http://127.0.0.1:8000/user/razorpay/webhook/')
+        parser.add_argument('--repeat', type=int, default=3, help='Deliveries of each payload.')
+        parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight.')
+        parser.add_argument('--secret', default=None, help='Webhook secret (default: the configured one).')
+        parser.add_argument('--timeout', type=float, default=10.0)
+
+    def handle(self, *args, **options):
+        bodies = self._bodies(options)
+        if not bodies:
+            raise CommandError('Nothing to replay')
+        deliveries = [body for body in bodies for _ in range(options['repeat'])]
+        self.stdout.write(f'{len(bodies)} payload(s) x {options["repeat"]} -> {len(deliveries)} request(s) '
+                          f'to {options["url"]} ({options["concurrency"]} concurrent)')
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(lambda body: self._post(body, options), deliveries))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(ms for _, ms in results)
+        outcomes = [outcome for outcome, _ in results]
+        self.stdout.write(
+            f"stored {outcomes.count('stored')}, duplicate {outcomes.count('duplicate')}, "
+            f"rejected {outcomes.count('rejected')}, error {outcomes.count('error')}"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(results) / elapsed:.0f} req/s; latency p50 {latencies[len(latencies) // 2]:.1f} ms, '
+            f'p95 {latencies[int(len(latencies) * 0.95)]:.1f} ms'
+        ))
+
+    def _bodies(self, options):
+        if options['from_inbox']:
+            payloads = (
+                WebhookEvent.objects.order_by('-received_at', '-id')
+                .values_list('payload', flat=True)[:options['from_inbox']]
+            )
+            return [json.dumps(payload).encode() for payload in payloads]
+        if not options['source']:
+            raise CommandError('Give a payload file or --from-inbox N')
+        with open(options['source'], 'rb') as handle:
+            return [line.strip() for line in handle if line.strip()]
+
+    def _post(self, body, options):
+        request = urllib.request.Request(options['url'], data=body, method='POST', headers={
+            'Content-Type': 'application/json',
+            'X-Razorpay-Signature': webhooks.sign(body, options['secret']),
+            # the same payload keeps its event id across deliveries, as with the gateway's retries
+            'X-Razorpay-Event-Id': 'replay_' + hashlib.sha256(body).hexdigest()[:24],
+        })
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=options['timeout']) as response:
+                outcome = 'duplicate' if json.loads(response.read()).get('duplicate') else 'stored'
+        except urllib.error.HTTPError as exc:
+            outcome = 'rejected' if exc.code == 400 else 'error'
+        except (urllib.error.URLError, OSError, ValueError):
+            outcome = 'error'
+        return outcome, (time.perf_counter() - started) * 1000
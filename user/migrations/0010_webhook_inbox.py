@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0009_payment_history_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(default='razorpay', max_length=30)),
+                ('dedupe_key', models.CharField(max_length=255)),
+                ('event_id', models.CharField(blank=True, default='', max_length=100)),
+                ('event', models.CharField(max_length=100)),
+                ('payment_id', models.CharField(blank=True, default='', max_length=100)),
+                ('order_id', models.CharField(blank=True, default='', max_length=100)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'received_at'], name='webhook_event_status_idx'), models.Index(fields=['payment_id'], name='webhook_event_payment_idx')],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'dedupe_key'), name='webhook_event_dedupe_uniq')],
+            },
+        ),
+    ]
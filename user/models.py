@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.conf import settings
 
 
@@ -46,6 +47,11 @@ class Event(models.Model):
     guests = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at'], name='event_recent_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} ({self.owner})"
 
@@ -67,6 +73,12 @@ class Payment(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
     payment_date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # payment history (user.ledger)
+            models.Index(fields=['user', '-payment_date'], name='payment_user_recent_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user} - {self.event.title}"
 
@@ -82,6 +94,11 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='notification_user_recent_idx'),
+        ]
+
     def __str__(self):
         return self.title
     
@@ -100,6 +117,11 @@ class Review(models.Model):
     comment = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at'], name='review_recent_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user} - {self.event.title}"
 
@@ -164,4 +186,133 @@ class GuestNotification(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+class NotificationCounter(models.Model):
+    """
+    Maintained unread-notification count for one User or one guest access,
+    kept current by user.unread so badges never have to COUNT the history.
+    """
+    user = models.OneToOneField(
+        'account.User', on_delete=models.CASCADE, null=True, blank=True, related_name='notification_counter'
+    )
+    guest_access = models.OneToOneField(
+        EventGuestAccess, on_delete=models.CASCADE, null=True, blank=True, related_name='notification_counter'
+    )
+    unread = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(user__isnull=False, guest_access__isnull=True)
+                | Q(user__isnull=True, guest_access__isnull=False),
+                name='notification_counter_one_owner',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user or self.guest_access}: {self.unread} unread"
+
+
+class WebhookEvent(models.Model):
+    """
+    Inbox of payment gateway webhook deliveries, written by the webhook view
+    and worked off by user.webhooks (manage.py process_webhooks).  A
+    redelivery of the same event maps to the same dedupe_key and is dropped.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    provider = models.CharField(max_length=30, default='razorpay')
+    dedupe_key = models.CharField(max_length=255)
+    event_id = models.CharField(max_length=100, blank=True, default='')  # X-Razorpay-Event-Id
+    event = models.CharField(max_length=100)
+    payment_id = models.CharField(max_length=100, blank=True, default='')
+    order_id = models.CharField(max_length=100, blank=True, default='')
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'dedupe_key'], name='webhook_event_dedupe_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'received_at'], name='webhook_event_status_idx'),
+            models.Index(fields=['payment_id'], name='webhook_event_payment_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.event} {self.dedupe_key} ({self.status})"
+
+
+class NotificationJob(models.Model):
+    """
+    A notification fan-out waiting to be delivered, written by user.notify
+    and worked off by `manage.py process_notifications`.  Jobs that coalesce
+    ("new photos", "event updated") share a coalesce_key, and at most one of
+    them is pending per key; later signals are merged into it.
+    """
+    KIND_USERS = 'users'
+    KIND_PHOTOS = 'photos'
+    KIND_EVENT_UPDATE = 'event_update'
+
+    KIND_CHOICES = [
+        (KIND_USERS, 'Users'),
+        (KIND_PHOTOS, 'New photos'),
+        (KIND_EVENT_UPDATE, 'Event updated'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, null=True, blank=True, related_name='notification_jobs')
+    coalesce_key = models.CharField(max_length=100, blank=True, default='')
+    count = models.PositiveIntegerField(default=0)      # photos merged into this job
+    payload = models.JSONField(default=dict)            # users: user_ids/title/message; event_update: message
+    progress = models.PositiveBigIntegerField(default=0)  # last recipient id delivered, so retries resume
+    due_at = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['coalesce_key'],
+                condition=models.Q(status='pending') & ~models.Q(coalesce_key=''),
+                name='notification_job_pending_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'due_at'], name='notification_job_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} job {self.id} ({self.status})"
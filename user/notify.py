@@ -0,0 +1,268 @@
+"""
+Notification dispatch: callers enqueue a NotificationJob and
+`manage.py process_notifications` fans it out to Notification /
+GuestNotification rows.  Set NOTIFY_ASYNC = False to deliver inline after commit.
+"""
+
+import itertools
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from user import unread
+from user.models import Event, EventGuestAccess, GuestNotification, Notification, NotificationJob
+
+logger = logging.getLogger(__name__)
+
+COALESCE_SECONDS = getattr(settings, "NOTIFY_COALESCE_SECONDS", 30)
+BATCH_SIZE = getattr(settings, "NOTIFY_BATCH_SIZE", 500)
+MAX_ATTEMPTS = getattr(settings, "NOTIFY_MAX_ATTEMPTS", 5)
+LEASE_SECONDS = getattr(settings, "NOTIFY_LEASE_SECONDS", 300)
+
+
+def _async() -> bool:
+    return getattr(settings, "NOTIFY_ASYNC", True)
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def notify_user(user_id, title: str, message: str) -> None:
+    """One in-app notification for a registered user."""
+    if user_id:
+        notify_users([user_id], title, message)
+
+
+def notify_users(user_ids, title: str, message: str) -> None:
+    user_ids = sorted(set(filter(None, user_ids)))
+    if user_ids:
+        _enqueue(NotificationJob(
+            kind=NotificationJob.KIND_USERS,
+            payload={"user_ids": user_ids, "title": title, "message": message},
+        ))
+
+
+def photos_added(event_id, count: int = 1) -> None:
+    """Tell the event's guests about new gallery photos (coalesced per event)."""
+    _enqueue(
+        NotificationJob(kind=NotificationJob.KIND_PHOTOS, event_id=event_id, count=count),
+        merge={"count": F("count") + count},
+    )
+
+
+def event_updated(event_id, message: str) -> None:
+    """Tell the event's guests the event changed (repeated edits coalesce)."""
+    _enqueue(
+        NotificationJob(kind=NotificationJob.KIND_EVENT_UPDATE, event_id=event_id, payload={"message": message}),
+        merge={"payload": {"message": message}},
+    )
+
+
+# ---------------------------------------------------------------------------
+# Enqueueing
+# ---------------------------------------------------------------------------
+
+def _enqueue(job, merge=None) -> None:
+    """
+    Store *job*; with *merge* (update kwargs) fold it into the pending job of
+    the same kind and event instead, if there is one.
+    """
+    if not _async():
+        transaction.on_commit(lambda: _deliver_now(job))
+        return
+    if merge is None:
+        job.due_at = timezone.now()
+        job.save()
+        return
+
+    job.coalesce_key = f"{job.kind}:{job.event_id}"
+    pending = NotificationJob.objects.filter(coalesce_key=job.coalesce_key, status=NotificationJob.STATUS_PENDING)
+    for _ in range(3):
+        if pending.update(**merge):
+            return
+        job.due_at = timezone.now() + timedelta(seconds=COALESCE_SECONDS)
+        try:
+            with transaction.atomic():
+                job.save(force_insert=True)
+            return
+        except IntegrityError:
+            job.pk = None       # another process created the pending job first; merge into it
+    raise RuntimeError(f"could not enqueue notification {job.coalesce_key}")
+
+
+# ---------------------------------------------------------------------------
+# Queue operations
+# ---------------------------------------------------------------------------
+
+def _expired(now):
+    """Lease over (or cleared by requeue_failed())."""
+    return Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - timedelta(seconds=LEASE_SECONDS))
+
+
+def _claimable(now, max_attempts=MAX_ATTEMPTS):
+    return (
+        Q(status=NotificationJob.STATUS_PENDING, due_at__lte=now)
+        | Q(_expired(now), status__in=(NotificationJob.STATUS_FAILED, NotificationJob.STATUS_PROCESSING),
+            attempts__lt=max_attempts)
+    )
+
+
+def fail_exhausted(max_attempts: int = MAX_ATTEMPTS) -> int:
+    """Mark jobs whose worker lost every attempt's lease 'failed' instead of reclaiming them forever."""
+    return NotificationJob.objects.filter(
+        _expired(timezone.now()), status=NotificationJob.STATUS_PROCESSING, attempts__gte=max_attempts,
+    ).update(status=NotificationJob.STATUS_FAILED, error="worker lost the job on every attempt (lease expired)")
+
+
+def pending_count(max_attempts: int = MAX_ATTEMPTS) -> int:
+    return NotificationJob.objects.filter(_claimable(timezone.now(), max_attempts)).count()
+
+
+def claim_batch(limit: int, max_attempts: int = MAX_ATTEMPTS) -> list:
+    """Atomically claim up to *limit* due jobs, oldest first."""
+    fail_exhausted(max_attempts)
+    now = timezone.now()
+    candidates = list(
+        NotificationJob.objects
+        .filter(_claimable(now, max_attempts))
+        .order_by("due_at", "id")
+        .values_list("id", "status", "claimed_at")[: limit * 2]
+    )
+    claimed_ids = []
+    for job_id, status, claimed_at in candidates:
+        if len(claimed_ids) >= limit:
+            break
+        won = NotificationJob.objects.filter(id=job_id, status=status, claimed_at=claimed_at).update(
+            status=NotificationJob.STATUS_PROCESSING,
+            claimed_at=now,
+            attempts=F("attempts") + 1,
+        )
+        if won:
+            claimed_ids.append(job_id)
+    jobs = NotificationJob.objects.in_bulk(claimed_ids)
+    return [jobs[job_id] for job_id in claimed_ids if job_id in jobs]
+
+
+def process(job) -> str:
+    """Deliver one claimed job and record the outcome; returns the new status."""
+    try:
+        deliver(job)
+    except Exception as exc:
+        logger.exception("Notification job %s (%s) failed", job.id, job.kind)
+        job.status = NotificationJob.STATUS_FAILED
+        job.error = str(exc)[:2000]
+        job.save(update_fields=["status", "error"])
+    else:
+        job.status = NotificationJob.STATUS_DONE
+        job.error = ""
+        job.processed_at = timezone.now()
+        job.save(update_fields=["status", "error", "processed_at"])
+    return job.status
+
+
+def process_pending(batch_size: int = 100, max_attempts: int = MAX_ATTEMPTS) -> int:
+    """Deliver due jobs until none is claimable; returns jobs processed."""
+    processed = 0
+    while True:
+        batch = claim_batch(batch_size, max_attempts)
+        if not batch:
+            return processed
+        for job in batch:
+            process(job)
+        processed += len(batch)
+
+
+def requeue_failed() -> int:
+    """Give every failed job a fresh set of attempts."""
+    return NotificationJob.objects.filter(status=NotificationJob.STATUS_FAILED).update(attempts=0, claimed_at=None)
+
+
+# ---------------------------------------------------------------------------
+# Delivery
+# ---------------------------------------------------------------------------
+
+def deliver(job) -> None:
+    """Write the notifications of *job* (saved or not), resuming after job.progress."""
+    if job.kind == NotificationJob.KIND_USERS:
+        _deliver_users(job)
+    elif job.kind == NotificationJob.KIND_PHOTOS:
+        _deliver_photos(job)
+    elif job.kind == NotificationJob.KIND_EVENT_UPDATE:
+        _fan_out_to_guests(
+            job, "notify_event_updates", GuestNotification.TYPE_EVENT_UPDATE,
+            title="Event updated", message=job.payload["message"],
+        )
+
+
+def _deliver_now(job) -> None:
+    try:
+        deliver(job)
+    except Exception:
+        logger.exception("Notification job %s failed", job.kind)
+
+
+def _batches(ids):
+    ids = iter(ids)
+    while batch := list(itertools.islice(ids, BATCH_SIZE)):
+        yield batch
+
+
+def _advance(job, last_id) -> None:
+    """Record delivery up to recipient *last_id* (inside the batch's transaction)."""
+    job.progress = last_id
+    if job.pk:
+        NotificationJob.objects.filter(pk=job.pk).update(progress=last_id)
+
+
+def _deliver_users(job) -> None:
+    title, message = job.payload["title"], job.payload["message"]
+    user_ids = [user_id for user_id in job.payload["user_ids"] if user_id > job.progress]
+    for batch in _batches(user_ids):
+        with transaction.atomic():
+            Notification.objects.bulk_create(
+                [Notification(user_id=user_id, title=title, message=message) for user_id in batch]
+            )
+            unread.bulk_added(user_ids=batch)
+            _advance(job, batch[-1])
+
+
+def _fan_out_to_guests(job, preference: str, notification_type: str, title: str, message: str) -> int:
+    recipients = (
+        EventGuestAccess.objects
+        .filter(event_id=job.event_id, is_active=True, id__gt=job.progress)
+        .exclude(**{f"notification_preference__{preference}": False})
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    sent = 0
+    for batch in _batches(list(recipients)):
+        with transaction.atomic():
+            GuestNotification.objects.bulk_create([
+                GuestNotification(
+                    guest_access_id=access_id, title=title, message=message,
+                    notification_type=notification_type,
+                )
+                for access_id in batch
+            ])
+            unread.bulk_added(guest_access_ids=batch)
+            _advance(job, batch[-1])
+        sent += len(batch)
+    return sent
+
+
+def _deliver_photos(job) -> None:
+    event = Event.objects.filter(id=job.event_id).only("title").first()
+    if event is None:
+        return
+    count = job.count
+    noun = "photo" if count == 1 else "photos"
+    _fan_out_to_guests(
+        job, "notify_new_photos", GuestNotification.TYPE_NEW_PHOTOS,
+        title=f"{count} new {noun}",
+        message=f"{count} new {noun} added to {event.title}.",
+    )
@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from user import unread
+from .models import GuestNotification, Notification
+
+
+def _owner(instance):
+    if isinstance(instance, Notification):
+        return {'user_id': instance.user_id}
+    return {'guest_access_id': instance.guest_access_id}
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_save, sender=GuestNotification)
+def notification_saved(sender, instance, created, **kwargs):
+    """Keep NotificationCounter (and the cached badge) in step with the rows."""
+    if not created:
+        unread.recount_notifications(**_owner(instance))
+    elif not instance.is_read:
+        unread.adjust_notifications(1, **_owner(instance))
+
+
+@receiver(post_delete, sender=Notification)
+@receiver(post_delete, sender=GuestNotification)
+def notification_deleted(sender, instance, **kwargs):
+    if not instance.is_read:
+        unread.adjust_notifications(-1, create=False, **_owner(instance))
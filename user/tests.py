@@ -1,3 +1,356 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from event.testing import ListingQueryBudgetMixin, login, make_booking, make_event, make_store, make_user, marketplace
+from user import gateway, notify, unread, webhooks
+from user.models import (
+    EventGuestAccess, GuestNotification, GuestNotificationPreference, Notification, NotificationCounter, NotificationJob,
+    Payment, WebhookEvent,
+)
+from vendor import booking_state
+from vendor.models import AdvancePayment, Booking, Chat, ChatMessage, Service
+
+
+@override_settings(LIST_PAGE_SIZE=5)
+class ListingQueryBudgetTests(ListingQueryBudgetMixin, TestCase):
+    """Customer listings cost a fixed number of queries however many rows exist."""
+
+    BUDGETS = {
+        'user:user_bookings': 3,        # + page (latest payment status annotated)
+        'user:user_notifications': 7,   # + page, mark read (UPDATE in a savepoint), COUNT
+        'user:stores_list': 7,          # + two facet counts, categories, page, COUNT
+        'user:user_payments': 5,        # + page (UNION of both tables), two status summaries
+        'user:payment_success': 4,      # + page, COUNT
+    }
+    INITIAL_ROWS = 6
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_user('Customer', is_active=True)
+        cls.event = make_event(cls.customer)
+        cls.rows = 0
+
+    def setUp(self):
+        login(self.client, self.customer, 'user')
+
+    def add_rows(self, count):
+        for _ in range(count):
+            n = self.rows = self.rows + 1
+            booking = make_booking(self.event, make_store(make_user(f'Vendor {n}', 'vendor'), f'Store {n}'))
+            AdvancePayment.objects.create(booking=booking, user=self.customer, amount=Decimal('20'), status='succeeded')
+            Payment.objects.create(user=self.customer, event=self.event, amount=Decimal('80'), status='success')
+            Notification.objects.create(user=self.customer, title=f'Notice {n}', message='-')
+
+
+@override_settings(LIST_PAGE_SIZE=5)
+class SearchQueryBudgetTests(ListingQueryBudgetMixin, TestCase):
+    """Full-text searches are paginated like any listing, in a fixed number of queries."""
+
+    BUDGETS = {
+        'user:stores_list': 7,          # + two facet counts, categories, page, COUNT
+        'user:services_list': 6,        # + two facet counts, categories, page
+    }
+    QUERY_STRING = '?search=photo'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_user('Customer', is_active=True)
+        cls.rows = 0
+
+    def setUp(self):
+        login(self.client, self.customer, 'user')
+
+    def add_rows(self, count):
+        for _ in range(count):
+            n = self.rows = self.rows + 1
+            store = make_store(make_user(f'Vendor {n}', 'vendor'), f'Photo Studio {n}', status=True)
+            Service.objects.create(store=store, name=f'Photo shoot {n}', description='-', price=Decimal('100'))
+
+    def test_pages_are_bounded(self):
+        self.add_rows(8)
+        page = self.client.get(reverse('user:stores_list') + self.QUERY_STRING).context['stores']
+        self.assertEqual(len(page), 5)
+        self.assertTrue(page.has_next)
+        rest = self.client.get(reverse('user:stores_list') + page.next_url).context['stores']
+        self.assertEqual(len(rest), 3)
+        self.assertFalse({store.id for store in page} & {store.id for store in rest})
+
+
+class BookingStateTests(TestCase):
+    """Payment state and the cancellation window come from vendor.booking_state."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.world = marketplace(event_date=timezone.now() + timedelta(days=10))
+
+    def test_latest_payment_status_is_the_newest_advance(self):
+        booking = self.world.booking
+        for status in (AdvancePayment.STATUS_FAILED, AdvancePayment.STATUS_SUCCEEDED):
+            AdvancePayment.objects.create(booking=booking, user=self.world.customer, amount=Decimal('20'), status=status)
+        booking = booking_state.with_payment_state(Booking.objects.filter(pk=booking.pk)).get()
+        self.assertEqual(booking.latest_payment_status, AdvancePayment.STATUS_SUCCEEDED)
+
+    def test_window_closes_halfway_to_the_event(self):
+        booking = Booking.objects.select_related('event').get(pk=self.world.booking.pk)
+        deadline = booking_state.cancel_deadline(booking)
+        self.assertEqual(deadline, booking.created_at + (booking.event.date - booking.created_at) / 2)
+        self.assertTrue(booking_state.is_cancellable(booking, now=deadline))
+        self.assertFalse(booking_state.is_cancellable(booking, now=deadline + timedelta(seconds=1)))
+        booking.status = Booking.STATUS_COMPLETED
+        self.assertFalse(booking_state.is_cancellable(booking, now=deadline))
+
+
+@override_settings(LIST_PAGE_SIZE=3)
+class PaymentLedgerTests(TestCase):
+    """The payments page merges Payment and AdvancePayment rows in SQL."""
+
+    def test_pages_merge_both_tables_newest_first(self):
+        world = marketplace()
+        expected = []
+        for n in range(4):
+            payment = Payment.objects.create(user=world.customer, event=world.event, amount=Decimal(n + 1), status='success')
+            advance = AdvancePayment.objects.create(booking=world.booking, user=world.customer, amount=Decimal(n + 1))
+            expected += [('payment', payment.id), ('advance', advance.id)]
+
+        login(self.client, world.customer, 'user')
+        url = reverse('user:user_payments')
+        response = self.client.get(url)
+        self.assertEqual(response.context['summary']['total'], 8)
+        seen = []
+        while True:
+            page = response.context['payments']
+            seen += [(entry.kind, entry.id) for entry in page]
+            if not page.has_next:
+                break
+            response = self.client.get(url + page.next_url)
+        self.assertEqual(seen, expected[::-1])
+
+
+class WebhookInboxTests(TestCase):
+    """Webhook deliveries are stored once and applied once (user.webhooks)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        world = marketplace(advance_required=Decimal('20'))
+        cls.booking = world.booking
+        cls.advance = AdvancePayment.objects.create(
+            booking=cls.booking, user=world.customer, amount=Decimal('20'), gateway='razorpay', gateway_id='order_1',
+        )
+
+    def deliver(self, body, signature=None):
+        return self.client.post(
+            reverse('user:razorpay_webhook'), body, content_type='application/json',
+            HTTP_X_RAZORPAY_SIGNATURE=signature or webhooks.sign(body),
+        )
+
+    def captured(self):
+        return json.dumps({
+            'event': 'payment.captured',
+            'payload': {'payment': {'entity': {'id': 'pay_1', 'order_id': 'order_1', 'status': 'captured', 'amount': 2000}}},
+        }).encode()
+
+    def test_redeliveries_are_stored_and_applied_once(self):
+        for _ in range(3):
+            self.assertEqual(self.deliver(self.captured()).status_code, 200)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.advance_paid, Decimal('0'))      # acknowledged, not yet applied
+
+        self.assertEqual(webhooks.process_pending(), 1)
+        self.assertEqual(webhooks.process_pending(), 0)
+        self.booking.refresh_from_db()
+        self.advance.refresh_from_db()
+        self.assertEqual(self.booking.advance_paid, Decimal('20'))
+        self.assertEqual(self.booking.status, Booking.STATUS_CONFIRMED)
+        self.assertEqual(self.advance.status, AdvancePayment.STATUS_SUCCEEDED)
+
+    def test_settlement_is_idempotent_across_paths(self):
+        entity = json.loads(self.captured())['payload']['payment']['entity']
+        self.assertEqual(webhooks.settle('order_1', 'pay_1', entity), 1)    # checkout callback
+        self.deliver(self.captured())
+        webhooks.process_pending()                                           # the webhook, later
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.advance_paid, Decimal('20'))
+
+    def test_event_that_keeps_losing_its_lease_ends_failed(self):
+        self.deliver(self.captured())
+        stale = timezone.now() - timedelta(seconds=webhooks.LEASE_SECONDS + 1)
+        WebhookEvent.objects.update(status=WebhookEvent.STATUS_PROCESSING, claimed_at=stale, attempts=3)
+        self.assertEqual(webhooks.process_pending(max_attempts=3), 0)
+        self.assertEqual(WebhookEvent.objects.get().status, WebhookEvent.STATUS_FAILED)
+        self.assertEqual(webhooks.requeue_failed(), 1)
+
+    def test_bad_signature_is_rejected(self):
+        self.assertEqual(self.deliver(self.captured(), signature='0' * 64).status_code, 400)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+
+class UnreadCounterTests(TestCase):
+    """Badge counters follow the rows they count (user.unread, user.signals, vendor.signals)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = make_user('Customer')
+        cls.vendor = make_user('Vendor', 'vendor')
+
+    def count(self):
+        return unread.notification_count(user_id=self.customer.id)
+
+    def notify(self, **fields):
+        return Notification.objects.create(user=self.customer, title='-', message='-', **fields)
+
+    def test_notification_counter_tracks_creates_deletes_and_reads(self):
+        self.assertEqual(self.count(), 0)
+        first, *_ = [self.notify() for _ in range(3)]
+        read = self.notify(is_read=True)
+        self.assertEqual(self.count(), 3)
+        first.delete()
+        read.delete()
+        self.assertEqual(self.count(), 2)
+        self.assertEqual(unread.mark_notifications_read(user_id=self.customer.id), 2)
+        self.assertEqual(self.count(), 0)
+
+    def test_bulk_added_moves_existing_counters(self):
+        self.count()
+        Notification.objects.bulk_create([Notification(user=self.customer, title='-', message='-')])
+        unread.bulk_added(user_ids=[self.customer.id])
+        self.assertEqual(self.count(), 1)
+
+    def test_chat_counters_track_each_side(self):
+        chat = Chat.objects.create(user=self.customer, vendor=self.vendor)
+        for _ in range(2):
+            ChatMessage.objects.create(chat=chat, sender=self.vendor, message='hi')
+        question = ChatMessage.objects.create(chat=chat, sender=self.customer, message='hello')
+        chat.refresh_from_db()
+        self.assertEqual((chat.customer_unread, chat.vendor_unread), (2, 1))
+
+        self.assertEqual(unread.mark_chat_read(chat, by_vendor=False), 2)
+        question.delete()
+        chat.refresh_from_db()
+        self.assertEqual((chat.customer_unread, chat.vendor_unread), (0, 0))
+
+    def test_counters_never_go_below_zero(self):
+        notice = self.notify()
+        chat = Chat.objects.create(user=self.customer, vendor=self.vendor)
+        message = ChatMessage.objects.create(chat=chat, sender=self.vendor, message='hi')
+        NotificationCounter.objects.filter(user=self.customer).update(unread=0)
+        Chat.objects.filter(id=chat.id).update(customer_unread=0)
+
+        notice.delete()
+        message.delete()
+        chat.refresh_from_db()
+        self.assertEqual(self.count(), 0)
+        self.assertEqual(chat.customer_unread, 0)
+
+    def test_repair_fixes_drifted_counters(self):
+        self.notify()
+        chat = Chat.objects.create(user=self.customer, vendor=self.vendor)
+        ChatMessage.objects.create(chat=chat, sender=self.vendor, message='hi')
+        NotificationCounter.objects.filter(user=self.customer).update(unread=7)
+        Chat.objects.filter(id=chat.id).update(customer_unread=5, vendor_unread=3)
+
+        out = StringIO()
+        call_command('repair_unread_counters', stdout=out)
+        self.assertIn('Repaired 1 user, 0 guest and 1 chat counter(s)', out.getvalue())
+        chat.refresh_from_db()
+        self.assertEqual(self.count(), 1)
+        self.assertEqual((chat.customer_unread, chat.vendor_unread), (1, 0))
+        self.assertEqual(unread.repair_all(), {'users': 0, 'guests': 0, 'chats': 0})
+
+
+@override_settings(NOTIFY_ASYNC=True)
+class NotificationJobTests(TestCase):
+    """Notifications are queued as NotificationJob rows and delivered by the worker (user.notify)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.event = make_event(make_user('Host'))
+        cls.guests = [
+            EventGuestAccess.objects.create(
+                event=cls.event, vendor=make_user(f'Vendor {n}', 'vendor'), guest_id=f'guest-{n}', password='-',
+            )
+            for n in range(2)
+        ]
+        GuestNotificationPreference.objects.create(guest_access=cls.guests[1], notify_new_photos=False)
+
+    def make_due(self):
+        NotificationJob.objects.update(due_at=timezone.now())
+
+    def test_photo_bursts_coalesce_and_honour_preferences(self):
+        for _ in range(3):
+            notify.photos_added(self.event.id)
+        job = NotificationJob.objects.get()
+        self.assertEqual((job.status, job.count), (NotificationJob.STATUS_PENDING, 3))
+        self.assertEqual(notify.process_pending(), 0)       # not due until the coalescing window closes
+
+        self.make_due()
+        self.assertEqual(notify.process_pending(), 1)
+        sent = GuestNotification.objects.get()
+        self.assertEqual((sent.guest_access_id, sent.title), (self.guests[0].id, '3 new photos'))
+        self.assertEqual(NotificationJob.objects.get().status, NotificationJob.STATUS_DONE)
+
+    def test_event_updates_keep_the_latest_message(self):
+        notify.event_updated(self.event.id, 'Moved to 6 pm')
+        notify.event_updated(self.event.id, 'Moved to 7 pm')
+        self.make_due()
+        self.assertEqual(notify.process_pending(), 1)
+        self.assertEqual(
+            sorted(GuestNotification.objects.values_list('guest_access_id', 'message')),
+            [(guest.id, 'Moved to 7 pm') for guest in self.guests],
+        )
+
+    def test_user_notifications_are_delivered_by_the_worker(self):
+        notify.notify_users([self.event.owner_id, None], 'Booking confirmed', '-')
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(notify.process_pending(), 1)
+        self.assertEqual(list(Notification.objects.values_list('user_id', flat=True)), [self.event.owner_id])
+
+
+@override_settings(PAYMENT_GATEWAY_BACKEND='fake')
+class FakeGatewayCheckoutTests(TestCase):
+    """The checkout flow runs end to end against the local stand-in gateway."""
+
+    def setUp(self):
+        gateway.reset()
+        self.addCleanup(gateway.reset)
+        world = marketplace(advance_required=Decimal('20'))
+        self.booking = world.booking
+        login(self.client, world.customer, 'user')
+
+    def test_client_is_shared(self):
+        self.assertIs(gateway.client(), gateway.client())
+
+    def test_advance_checkout_applies_once(self):
+        response = self.client.post(reverse('user:pay_booking', args=[self.booking.id]), {'method': 'advance'})
+        order_id = response.context['order_id']
+        self.assertEqual(response.context['gateway'], 'fake')
+
+        paid = self.client.post(reverse('user:fake_gateway_pay'), {'order_id': order_id}, content_type='application/json').json()
+        confirmed = self.client.post(reverse('user:razorpay_payment_success'), paid, content_type='application/json')
+        self.assertTrue(confirmed.json()['success'])
+        self.assertEqual(webhooks.process_pending(), 1)     # the stand-in's webhook for the same payment
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.advance_paid, Decimal('20'))
+        self.assertEqual(self.booking.status, Booking.STATUS_CONFIRMED)
+
+    def test_callback_without_a_record_creates_and_applies_it_once(self):
+        client = gateway.client()
+        order = client.create_order(2000, 'INR', f'booking_{self.booking.id}_advance')
+        order_id = f"order_booking_{self.booking.id}_advance"     # order never recorded at checkout
+        client._orders[order_id] = {**order, 'id': order_id}
+        paid = {'razorpay_order_id': order_id, 'razorpay_payment_id': client.pay(order_id)['id']}
+        for _ in range(2):
+            confirmed = self.client.post(reverse('user:razorpay_payment_success'), paid, content_type='application/json')
+            self.assertTrue(confirmed.json()['success'])
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.advance_paid, Decimal('20'))
+        self.assertEqual(AdvancePayment.objects.filter(booking=self.booking).count(), 1)
@@ -0,0 +1,194 @@
+"""
+Maintained unread counters for notification and chat badges, moved with F()
+expressions alongside the rows they count.  `manage.py repair_unread_counters`
+recomputes them.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, ExpressionWrapper, F, IntegerField, Q, When
+from django.db.models.functions import Greatest
+
+from event.context_processors import invalidate_unread, invalidate_unread_many
+from user.models import GuestNotification, Notification, NotificationCounter
+from vendor import chat_events
+from vendor.models import Chat
+
+
+def _floor(field: str, delta: int):
+    """F(field) + delta, never below zero (counters are PositiveIntegerFields)."""
+    moved = ExpressionWrapper(F(field) + delta, output_field=IntegerField())
+    return Greatest(moved, 0, output_field=IntegerField())
+
+
+def _owner(user_id=None, guest_access_id=None):
+    if user_id:
+        return {'user_id': user_id}
+    return {'guest_access_id': guest_access_id}
+
+
+def _notifications(owner):
+    if 'user_id' in owner:
+        return Notification.objects.filter(user_id=owner['user_id'])
+    return GuestNotification.objects.filter(guest_access_id=owner['guest_access_id'])
+
+
+# ---------------------------------------------------------------------------
+# Notifications
+# ---------------------------------------------------------------------------
+
+def notification_count(user_id=None, guest_access_id=None) -> int:
+    """Unread notifications of a user or guest access (one indexed lookup)."""
+    owner = _owner(user_id, guest_access_id)
+    unread = NotificationCounter.objects.filter(**owner).values_list('unread', flat=True).first()
+    if unread is None:
+        unread = recount_notifications(**owner)
+    return unread
+
+
+def recount_notifications(user_id=None, guest_access_id=None) -> int:
+    owner = _owner(user_id, guest_access_id)
+    unread = _notifications(owner).filter(is_read=False).count()
+    try:
+        with transaction.atomic():
+            NotificationCounter.objects.update_or_create(defaults={'unread': unread}, **owner)
+    except IntegrityError:
+        # A concurrent request created the row first; its value is as good.
+        pass
+    invalidate_unread(**owner)
+    return unread
+
+
+def adjust_notifications(delta: int, user_id=None, guest_access_id=None, create=True) -> None:
+    """
+    Move the owner's counter by *delta*.  A missing row is created from a
+    COUNT unless *create* is False (deletes, which may be cascading from the
+    owner itself).
+    """
+    owner = _owner(user_id, guest_access_id)
+    moved = NotificationCounter.objects.filter(**owner).update(unread=_floor('unread', delta))
+    if not moved and create:
+        recount_notifications(**owner)
+    else:
+        invalidate_unread(**owner)
+
+
+def bulk_added(user_ids=(), guest_access_ids=()) -> None:
+    """
+    One new unread notification per listed owner (bulk_create sends no
+    signals).  Owners without a counter row are counted on first read.
+    """
+    if user_ids:
+        NotificationCounter.objects.filter(user_id__in=user_ids).update(unread=F('unread') + 1)
+    if guest_access_ids:
+        NotificationCounter.objects.filter(guest_access_id__in=guest_access_ids).update(unread=F('unread') + 1)
+    invalidate_unread_many(user_ids, guest_access_ids)
+
+
+def mark_notifications_read(user_id=None, guest_access_id=None) -> int:
+    """Mark every unread notification of the owner read; returns how many."""
+    owner = _owner(user_id, guest_access_id)
+    with transaction.atomic():
+        changed = _notifications(owner).filter(is_read=False).update(is_read=True)
+        if changed:
+            adjust_notifications(-changed, **owner)
+    return changed
+
+
+# ---------------------------------------------------------------------------
+# Chats
+# ---------------------------------------------------------------------------
+
+def _bump_chat(message, delta: int) -> None:
+    """Move the recipient's counter of *message*'s chat by *delta* in one UPDATE."""
+    customer = _floor('customer_unread', delta)
+    vendor = _floor('vendor_unread', delta)
+    chat = Chat.objects.filter(id=message.chat_id)
+    if not message.sender_id:
+        chat.update(vendor_unread=vendor)       # guest -> vendor
+        return
+    from_vendor = Q(vendor_id=message.sender_id)
+    chat.update(
+        customer_unread=Case(When(from_vendor, then=customer), default=F('customer_unread'), output_field=IntegerField()),
+        vendor_unread=Case(When(from_vendor, then=F('vendor_unread')), default=vendor, output_field=IntegerField()),
+    )
+
+
+def message_created(message) -> None:
+    if not message.is_read:
+        _bump_chat(message, 1)
+
+
+def message_deleted(message) -> None:
+    if not message.is_read:
+        _bump_chat(message, -1)
+
+
+def mark_chat_read(chat, by_vendor: bool) -> int:
+    """
+    Mark the messages *to* the reader (vendor, or the user/guest) as read
+    and move that side's counter down accordingly; returns how many.
+    """
+    from_vendor = Q(sender_id=chat.vendor_id)
+    incoming = chat.messages.filter(is_read=False).filter(~from_vendor if by_vendor else from_vendor)
+    field = 'vendor_unread' if by_vendor else 'customer_unread'
+    with transaction.atomic():
+        changed = incoming.update(is_read=True)
+        if changed:
+            Chat.objects.filter(id=chat.id).update(**{field: _floor(field, -changed)})
+            chat_events.messages_read(chat, by_vendor)
+    setattr(chat, field, max(getattr(chat, field) - changed, 0))
+    return changed
+
+
+def recount_chat(chat_id) -> None:
+    chat = Chat.objects.filter(id=chat_id).annotate(**_chat_counts()).first()
+    if chat is not None:
+        Chat.objects.filter(id=chat_id).update(
+            vendor_unread=chat.real_vendor_unread, customer_unread=chat.real_customer_unread,
+        )
+
+
+def _chat_counts():
+    unread = Q(messages__is_read=False)
+    from_vendor = Q(messages__sender_id=F('vendor_id'))
+    return {
+        'real_vendor_unread': Count('messages', filter=unread & ~from_vendor),
+        'real_customer_unread': Count('messages', filter=unread & from_vendor),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Repair
+# ---------------------------------------------------------------------------
+
+def repair_all() -> dict:
+    """Recompute every counter from the underlying rows; returns fixes per kind."""
+    fixed = {'users': 0, 'guests': 0, 'chats': 0}
+
+    for kind, model, owner_field in (
+        ('users', Notification, 'user_id'),
+        ('guests', GuestNotification, 'guest_access_id'),
+    ):
+        real = dict(
+            model.objects.filter(is_read=False).order_by()
+            .values_list(owner_field).annotate(n=Count('id'))
+        )
+        stored = dict(
+            NotificationCounter.objects.filter(**{f'{owner_field}__isnull': False})
+            .values_list(owner_field, 'unread')
+        )
+        for owner_id in set(real) | set(stored):
+            if real.get(owner_id, 0) != stored.get(owner_id):
+                NotificationCounter.objects.update_or_create(
+                    defaults={'unread': real.get(owner_id, 0)}, **{owner_field: owner_id},
+                )
+                invalidate_unread(**{owner_field: owner_id})
+                fixed[kind] += 1
+
+    for chat in Chat.objects.annotate(**_chat_counts()).iterator():
+        if (chat.vendor_unread, chat.customer_unread) != (chat.real_vendor_unread, chat.real_customer_unread):
+            Chat.objects.filter(id=chat.id).update(
+                vendor_unread=chat.real_vendor_unread, customer_unread=chat.real_customer_unread,
+            )
+            fixed['chats'] += 1
+    return fixed
@@ -30,10 +30,13 @@ urlpatterns = [
     path('booking/<int:booking_id>/pay/', views.pay_booking, name='pay_booking'),
     path('razorpay/payment-success/', views.razorpay_payment_success, name='razorpay_payment_success'),
     path('razorpay/webhook/', views.razorpay_webhook, name='razorpay_webhook'),
+    path('razorpay/fake-pay/', views.fake_gateway_pay, name='fake_gateway_pay'),
     path('booking/<int:booking_id>/payments/', views.booking_payments, name='booking_payments'),
     # Chat with vendors
     path('chat/', views.user_chat, name='user_chat'),
     path('chat/<int:chat_id>/', views.user_chat_detail, name='user_chat_detail'),
+    path('chat/<int:chat_id>/messages/', views.user_chat_messages, name='user_chat_messages'),
+    path('chat/<int:chat_id>/events/', views.user_chat_events, name='user_chat_events'),
     path('chat/<int:chat_id>/delete/', views.user_delete_chat, name='user_delete_chat'),
     path('chat/message/<int:message_id>/delete/', views.user_delete_message, name='user_delete_message'),
     path('store/<int:store_id>/chat/', views.start_chat, name='start_chat'),
@@ -1,6 +1,6 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse
-from django.db.models import Count, Q, Avg
+from django.db.models import Count, Q, Avg, F
 from .models import Notification, Profile, Event, Payment, Review
 from django.utils import timezone
 from datetime import timedelta
@@ -21,6 +21,9 @@ from django.contrib import messages
 import json
 from django.views.decorators.csrf import csrf_exempt
 import logging
+from user import gateway, ledger, notify, unread, webhooks
+from event.pagination import paginate
+from vendor import booking_state, chat_events, chat_history, search
 
 logger = logging.getLogger(__name__)
 
@@ -31,9 +34,7 @@ def user_required(view_func):
         user_id = request.session.get('user_id')
         if not user_id:
             return redirect('/login/')
-        try:
-            User.objects.get(id=user_id)
-        except User.DoesNotExist:
+        if not request.user.is_authenticated:
             request.session.flush()
             return redirect('/login/')
         return view_func(request, *args, **kwargs)
@@ -56,11 +57,7 @@ def user_dashboard(request):
 
     now = timezone.now()
 
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
-        request.session.flush()
-        return redirect('/login/')
+    user = request.user
 
     total_events = Event.objects.filter(owner=user).count()
     upcoming_events = Event.objects.filter(owner=user, date__gte=now).count()
@@ -89,7 +86,7 @@ def user_dashboard(request):
 @user_required
 def edit_profile(request):
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
 
     if request.method == 'POST':
         fullname = request.POST.get('fullname', '').strip()
@@ -120,7 +117,7 @@ def edit_profile(request):
 @user_required
 def user_details(request):
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     return render(request, 'user/user_details.html', {'user': user})
 def vendor_photos(request):
     # Your code here
@@ -134,43 +131,14 @@ def vendor_event_photos(request, event_id):
 @user_required
 def user_payments(request):
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
-
-    # Gather legacy `Payment` records and AdvancePayment records into a unified list
-    unified = []
-
-    # Legacy Payment model (if any)
-    for p in Payment.objects.filter(user=user).order_by('-payment_date'):
-        unified.append({
-            'type': 'payment',
-            'id': p.id,
-            'related': getattr(p, 'event', None),
-            'amount': p.amount,
-            'status': (p.status or '').lower(),
-            'when': getattr(p, 'payment_date', None),
-            'gateway': getattr(p, 'gateway', '') if hasattr(p, 'gateway') else '',
-            'raw': p,
-        })
-
-    # AdvancePayment records (deposit / token-style payments)
-    for a in AdvancePayment.objects.filter(user=user).order_by('-created_at'):
-        related_event = a.booking.event if a.booking and getattr(a.booking, 'event', None) else None
-        unified.append({
-            'type': 'advance',
-            'id': a.id,
-            'related': related_event,
-            'amount': a.amount,
-            'status': (a.status or '').lower(),
-            'when': a.created_at,
-            'gateway': a.gateway,
-            'raw': a,
-        })
-
-    # Sort unified list by `when` desc (items without a when go last)
-    unified.sort(key=lambda x: x['when'] or timezone.datetime(1970, 1, 1, tzinfo=timezone.utc), reverse=True)
+    user = request.user
+
+    # Payments and booking advances, merged and paged by the database
+    payments = ledger.page(request, user)
 
     return render(request, 'user/payments.html', {
-        'payments': unified,
+        'payments': payments,
+        'summary': ledger.summary(user),
         'user': user,
     })
 
@@ -179,7 +147,7 @@ def user_payments(request):
 @user_required
 def make_payment(request, event_id):
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     event = get_object_or_404(Event, id=event_id, owner=user)
 
     if request.method == "POST":
@@ -204,36 +172,12 @@ def make_payment(request, event_id):
 @user_required
 def payment_success(request):
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
-    # Combine legacy Payment.success and AdvancePayment succeeded records
-    unified = []
-    for p in Payment.objects.filter(user=user, status=Payment.STATUS_SUCCESS).order_by('-payment_date'):
-        unified.append({
-            'id': p.id,
-            'related': getattr(p, 'event', None),
-            'amount': p.amount,
-            'when': getattr(p, 'payment_date', None),
-            'gateway': getattr(p, 'gateway', '' ) if hasattr(p, 'gateway') else '',
-            'raw': p,
-        })
-
-    for a in AdvancePayment.objects.filter(user=user, status=AdvancePayment.STATUS_SUCCEEDED).order_by('-created_at'):
-        related_event = a.booking.event if a.booking and getattr(a.booking, 'event', None) else None
-        unified.append({
-            'id': a.id,
-            'related': related_event,
-            'amount': a.amount,
-            'when': a.created_at,
-            'gateway': a.gateway,
-            'raw': a,
-        })
-
-    unified.sort(key=lambda x: x['when'] or timezone.datetime(1970,1,1, tzinfo=timezone.utc), reverse=True)
-    total_successful = len(unified)
+    user = request.user
+    successful_payments = ledger.page(request, user, status=ledger.SUCCEEDED)
 
     return render(request, 'user/payment_success.html', {
-        'successful_payments': unified,
-        'total_successful': total_successful,
+        'successful_payments': successful_payments,
+        'total_successful': successful_payments.total,
         'user': user,
     })
 
@@ -242,36 +186,12 @@ def payment_success(request):
 @user_required
 def payment_failed(request):
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
-    # Combine legacy Payment.failed and AdvancePayment failed records
-    unified = []
-    for p in Payment.objects.filter(user=user, status=Payment.STATUS_FAILED).order_by('-payment_date'):
-        unified.append({
-            'id': p.id,
-            'related': getattr(p, 'event', None),
-            'amount': p.amount,
-            'when': getattr(p, 'payment_date', None),
-            'gateway': getattr(p, 'gateway', '' ) if hasattr(p, 'gateway') else '',
-            'raw': p,
-        })
-
-    for a in AdvancePayment.objects.filter(user=user, status=AdvancePayment.STATUS_FAILED).order_by('-created_at'):
-        related_event = a.booking.event if a.booking and getattr(a.booking, 'event', None) else None
-        unified.append({
-            'id': a.id,
-            'related': related_event,
-            'amount': a.amount,
-            'when': a.created_at,
-            'gateway': a.gateway,
-            'raw': a,
-        })
-
-    unified.sort(key=lambda x: x['when'] or timezone.datetime(1970,1,1, tzinfo=timezone.utc), reverse=True)
-    total_failed = len(unified)
+    user = request.user
+    failed_payments = ledger.page(request, user, status=ledger.FAILED)
 
     return render(request, 'user/payment_failed.html', {
-        'failed_payments': unified,
-        'total_failed': total_failed,
+        'failed_payments': failed_payments,
+        'total_failed': failed_payments.total,
         'user': user,
     })
 
@@ -284,10 +204,11 @@ def is_logged_in(request):
 @user_required
 def user_notifications(request):
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
 
-    notifications = Notification.objects.filter(user=user).order_by('-created_at')
-    notifications.filter(is_read=False).update(is_read=True)
+    # fetch the page before marking read, so this visit still shows what was new
+    notifications = paginate(request, Notification.objects.filter(user=user))
+    unread.mark_notifications_read(user_id=user.id)
     return render(request, 'user/notifications.html', {
         'notifications': notifications,
         'user': user,
@@ -296,7 +217,7 @@ def user_notifications(request):
 @user_required
 def user_events(request):
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     events = Event.objects.filter(owner=user).order_by('-date')
     status_filter = request.GET.get('status')
     if status_filter:
@@ -314,7 +235,7 @@ def user_events(request):
 def event_create(request):
     """Create a new event."""
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     if request.method == 'POST':
         title = request.POST.get('title', '').strip()
         date_str = request.POST.get('date')
@@ -351,7 +272,7 @@ def event_create(request):
 def event_edit(request, event_id):
     """Edit an existing event."""
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     event = get_object_or_404(Event, id=event_id, owner=user)
     if request.method == 'POST':
         title = request.POST.get('title', '').strip()
@@ -378,6 +299,7 @@ def event_edit(request, event_id):
         if status in dict(Event.STATUS_CHOICES):
             event.status = status
         event.save()
+        notify.event_updated(event.id, f'{event.title} was updated. Check the latest details.')
         messages.success(request, 'Event updated successfully.')
         return redirect('user:user_events')
     return render(request, 'user/event_form.html', {'user': user, 'event': event})
@@ -387,7 +309,7 @@ def event_edit(request, event_id):
 def event_delete(request, event_id):
     """Delete an event."""
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     event = get_object_or_404(Event, id=event_id, owner=user)
     if request.method == 'POST':
         event.delete()
@@ -400,7 +322,7 @@ def event_delete(request, event_id):
 def event_detail(request, event_id):
     """Show full details for a single event, including bookings, payments and reviews."""
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     event = get_object_or_404(Event, id=event_id, owner=user)
 
     # Bookings for this event
@@ -421,7 +343,7 @@ def event_detail(request, event_id):
 @user_required
 def user_reviews(request):
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     reviews = Review.objects.filter(user=user).select_related('event').order_by('-created_at')
     return render(request, 'user/reviews.html', {
         'reviews': reviews,
@@ -433,7 +355,7 @@ def user_reviews(request):
 def review_write_list(request):
     """List completed events for the user that are eligible for writing a review."""
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     # completed events owned by the user
     completed_events = Event.objects.filter(owner=user, status=Event.STATUS_COMPLETED).order_by('-date')
     reviewed_ids = set(Review.objects.filter(user=user).values_list('event_id', flat=True))
@@ -448,7 +370,7 @@ def review_write_list(request):
 def review_create(request, event_id):
     """Add a review for a completed event (1-5 stars + comment)."""
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     event = get_object_or_404(Event, id=event_id, owner=user)
     if Review.objects.filter(user=user, event=event).exists():
         messages.warning(request, 'You have already reviewed this event.')
@@ -473,7 +395,7 @@ def review_create(request, event_id):
 def change_password(request):
     """User change password (same flow as vendor)."""
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     if request.method == 'POST':
         old = request.POST.get('current_password') or request.POST.get('old_password')
         new = request.POST.get('new_password')
@@ -496,12 +418,16 @@ def change_password(request):
 
 @user_required
 def services_list(request):
-    """List of active services for users to browse."""
+    """List of active services for users to browse, with search and filters."""
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
-    services = Service.objects.filter(is_active=True).select_related('store')
+    user = request.user
+    filters = search.criteria(request.GET)
+    found = search.search_services(**filters)
     return render(request, 'user/services_list.html', {
-        'services': services,
+        'services': search.page(request, found),
+        'categories': found['categories'],
+        'cities': found['cities'],
+        'filters': filters,
         'user': user,
     })
 
@@ -509,27 +435,18 @@ def services_list(request):
 # ---------- Stores (user-facing) ----------
 @user_required
 def stores_list(request):
-    """List active stores with filter by category and search."""
+    """List active stores with full-text search, category/city facets and price filters."""
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
-    from vendor.models import category as Category
-    stores = Store.objects.filter(status=True).select_related('vendor', 'category').order_by('store_name')
-    category_id = request.GET.get('category')
-    search = request.GET.get('search', '').strip()
-    if category_id:
-        stores = stores.filter(category_id=category_id)
-    if search:
-        stores = stores.filter(
-            Q(store_name__icontains=search) |
-            Q(description__icontains=search) |
-            Q(city__icontains=search)
-        )
-    categories = Category.objects.all()
+    user = request.user
+    filters = search.criteria(request.GET)
+    found = search.search_stores(**filters)
     return render(request, 'user/stores_list.html', {
-        'stores': stores,
-        'categories': categories,
-        'category_id': category_id,
-        'search': search,
+        'stores': search.page(request, found),
+        'categories': found['categories'],
+        'cities': found['cities'],
+        'filters': filters,
+        'category_id': filters['category_id'],
+        'search': filters['query'],
         'user': user,
     })
 
@@ -538,7 +455,7 @@ def stores_list(request):
 def store_detail(request, store_id):
     """Store detail with services, gallery, vendor rating and booking form."""
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     store = get_object_or_404(Store, id=store_id, status=True)
     services = Service.objects.filter(store=store, is_active=True)
     events = Event.objects.filter(owner=user).order_by('-date')
@@ -574,7 +491,7 @@ def store_detail(request, store_id):
 def create_booking(request, store_id):
     """Create a booking for a store/service linked to user's event."""
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     store = get_object_or_404(Store, id=store_id, status=True)
 
     if request.method == 'POST':
@@ -646,10 +563,10 @@ def create_booking(request, store_id):
 def user_bookings(request):
     """List and cancel user's bookings."""
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     bookings = Booking.objects.filter(customer=user).select_related(
         'event', 'store', 'service', 'vendor'
-    ).order_by('-created_at')
+    )
 
     status_filter = request.GET.get('status')
     if status_filter:
@@ -661,29 +578,7 @@ def user_bookings(request):
         if action == 'cancel':
             try:
                 b = bookings.get(id=booking_id)
-                # Determine cancellable window: halfway between booking creation and event date
-                event_dt = None
-                try:
-                    event_dt = b.event.date if getattr(b, 'event', None) and getattr(b.event, 'date', None) else b.booking_date
-                except Exception:
-                    event_dt = b.booking_date
-
-                now = timezone.now()
-                cancellable = False
-                # Allow cancellation for pending or confirmed bookings within the halfway window
-                if b.status in (Booking.STATUS_PENDING, Booking.STATUS_CONFIRMED):
-                    if event_dt:
-                        try:
-                            halfway = b.created_at + (event_dt - b.created_at) / 2
-                            cancellable = now <= halfway
-                        except Exception:
-                            # if arithmetic fails, fallback to allowing cancellation for pending bookings
-                            cancellable = True
-                    else:
-                        # No event date available — allow cancellation for pending/confirmed bookings
-                        cancellable = True
-
-                if cancellable:
+                if booking_state.is_cancellable(b):
                     # User chose to cancel — per policy, token/advance is kept by vendor.
                     b.status = Booking.STATUS_CANCELLED
                     now_dt = timezone.now()
@@ -721,47 +616,9 @@ def user_bookings(request):
                 messages.error(request, 'Booking not found.')
         return redirect('user:user_bookings')
 
-    # Attach latest advance payment and remaining amount to each booking
-    for b in bookings:
-        b.latest_payment = b.advance_payments.order_by('-created_at').first()
-        paid = b.advance_paid or Decimal('0')
-        total = b.amount or Decimal('0')
-        b.amount_remaining = max(total - paid, Decimal('0'))
-        # compute whether this booking can be cancelled (halfway rule)
-        event_dt = None
-        try:
-            event_dt = b.event.date if getattr(b, 'event', None) and getattr(b.event, 'date', None) else b.booking_date
-        except Exception:
-            event_dt = b.booking_date
-        now = timezone.now()
-        b.cancellable = False
-        # Allow cancellation for pending or confirmed bookings within the halfway window
-        if b.status in (Booking.STATUS_PENDING, Booking.STATUS_CONFIRMED):
-            if event_dt:
-                try:
-                    halfway = b.created_at + (event_dt - b.created_at) / 2
-                    b.cancellable = now <= halfway
-                except Exception:
-                    b.cancellable = True
-            else:
-                b.cancellable = True
-        # expose event and halfway datetimes for debugging/UI display
-        try:
-            b.event_dt = event_dt
-        except Exception:
-            b.event_dt = None
-        try:
-            b.halfway_dt = halfway if 'halfway' in locals() else None
-        except Exception:
-            b.halfway_dt = None
-        # Display remaining amount: for cancelled bookings under keep-policy show 0
-        try:
-            if b.status == Booking.STATUS_CANCELLED:
-                b.display_amount_remaining = Decimal('0')
-            else:
-                b.display_amount_remaining = b.amount_remaining
-        except Exception:
-            b.display_amount_remaining = b.amount_remaining
+    bookings = paginate(request, booking_state.with_payment_state(bookings))
+    # latest payment status, remaining amount and cancel window, without extra queries
+    booking_state.attach(bookings)
 
     return render(request, 'user/bookings.html', {
         'bookings': bookings,
@@ -774,7 +631,7 @@ def user_bookings(request):
 def pay_booking(request, booking_id):
     """Allow user to pay booking advance either via full (gateway stub) or tokens."""
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     try:
         booking = Booking.objects.get(id=booking_id, customer=user)
     except Booking.DoesNotExist:
@@ -792,18 +649,13 @@ def pay_booking(request, booking_id):
         method = request.POST.get('method')
         with transaction.atomic():
             if method == 'advance':
-                # Create a Razorpay order for the advance amount and render checkout
-                try:
-                    import razorpay
-                except Exception:
-                    messages.error(request, 'Payment gateway not configured (razorpay library missing).')
-                    return redirect('user:pay_booking', booking_id=booking.id)
-                client = razorpay.Client(auth=(getattr(settings, 'RAZORPAY_KEY_ID', ''), getattr(settings, 'RAZORPAY_KEY_SECRET', '')))
+                # Create a gateway order for the advance amount and render checkout
                 # amount in paise (advance due)
                 amount_paise = int((advance_due * Decimal('100')).quantize(Decimal('1')))
                 try:
-                    order = client.order.create({'amount': amount_paise, 'currency': 'INR', 'receipt': f'booking_{booking.id}_advance', 'payment_capture': 1})
-                except Exception:
+                    client = gateway.client()
+                    order = client.create_order(amount_paise, 'INR', f'booking_{booking.id}_advance')
+                except gateway.GatewayError:
                     logger.exception('Failed to create razorpay order for advance')
                     messages.error(request, 'Failed to initiate payment. Try again later.')
                     return redirect('user:pay_booking', booking_id=booking.id)
@@ -820,7 +672,8 @@ def pay_booking(request, booking_id):
                 )
 
                 return render(request, 'user/razorpay_checkout.html', {
-                    'key_id': getattr(settings, 'RAZORPAY_KEY_ID', ''),
+                    'key_id': client.key_id,
+                    'gateway': client.name,
                     'order_id': order.get('id'),
                     'amount_paise': amount_paise,
                     'booking': booking,
@@ -828,20 +681,14 @@ def pay_booking(request, booking_id):
                 })
 
             elif method == 'full':
-                # Create a Razorpay order and render checkout page
-                try:
-                    import razorpay
-                except Exception:
-                    messages.error(request, 'Payment gateway not configured (razorpay library missing).')
-                    return redirect('user:pay_booking', booking_id=booking.id)
-
-                client = razorpay.Client(auth=(getattr(settings, 'RAZORPAY_KEY_ID', ''), getattr(settings, 'RAZORPAY_KEY_SECRET', '')))
+                # Create a gateway order and render checkout page
                 # amount in paise — charge remaining balance, not full original amount
                 amount_to_charge = amount_remaining
                 amount_paise = int((amount_to_charge * Decimal('100')).quantize(Decimal('1')))
                 try:
-                    order = client.order.create({'amount': amount_paise, 'currency': 'INR', 'receipt': f'booking_{booking.id}', 'payment_capture': 1})
-                except Exception:
+                    client = gateway.client()
+                    order = client.create_order(amount_paise, 'INR', f'booking_{booking.id}')
+                except gateway.GatewayError:
                     logger.exception('Failed to create razorpay order')
                     messages.error(request, 'Failed to initiate payment. Try again later.')
                     return redirect('user:pay_booking', booking_id=booking.id)
@@ -858,7 +705,8 @@ def pay_booking(request, booking_id):
                 )
 
                 return render(request, 'user/razorpay_checkout.html', {
-                    'key_id': getattr(settings, 'RAZORPAY_KEY_ID', ''),
+                    'key_id': client.key_id,
+                    'gateway': client.name,
                     'order_id': order.get('id'),
                     'amount_paise': amount_paise,
                     'booking': booking,
@@ -878,7 +726,7 @@ def pay_booking(request, booking_id):
 @user_required
 def booking_payments(request, booking_id):
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     try:
         booking = Booking.objects.get(id=booking_id, customer=user)
     except Booking.DoesNotExist:
@@ -917,19 +765,11 @@ def razorpay_payment_success(request):
             apx.save()
         return JsonResponse({'success': False, 'error': 'missing fields', 'payload': payload, 'ap_found': bool(apx)}, status=400)
 
-    try:
-        import razorpay
-    except Exception:
-        logger.exception('Razorpay SDK not installed')
-        return JsonResponse({'success': False, 'error': 'razorpay sdk not available'}, status=500)
-
-    client = razorpay.Client(auth=(getattr(settings, 'RAZORPAY_KEY_ID', ''), getattr(settings, 'RAZORPAY_KEY_SECRET', '')))
-
     # Instead of verifying client signature (which may fail in some envs), fetch the payment
     # directly from Razorpay and validate order_id and status.
     try:
-        payment_obj = client.payment.fetch(payment_id)
-    except Exception as e:
+        payment_obj = gateway.client().fetch_payment(payment_id)
+    except gateway.GatewayError as e:
         logger.exception('Failed to fetch payment from Razorpay')
         apx = AdvancePayment.objects.filter(gateway_id=order_id, gateway='razorpay').first()
         if apx:
@@ -955,20 +795,32 @@ def razorpay_payment_success(request):
         return JsonResponse({'success': False, 'error': 'payment_not_captured', 'status': fetched_status}, status=400)
 
     # Payment is valid and captured/authorized: mark AdvancePayment succeeded and apply advance
-    ap = AdvancePayment.objects.select_for_update().filter(gateway_id=order_id, gateway='razorpay').first()
-    if not ap:
-        # create record if missing
+    # (exactly once, even racing the webhook for the same payment)
+    if webhooks.settle(order_id, payment_id, payment_obj):
+        return JsonResponse({'success': True})
+
+    # create record if missing
+    booking_ref = None
+    try:
+        if order_id and 'booking_' in order_id:
+            parts = order_id.split('booking_')[-1]
+            bid = int(parts.split('_')[0])
+            booking_ref = Booking.objects.filter(id=bid).first()
+    except Exception:
         booking_ref = None
-        try:
-            if order_id and 'booking_' in order_id:
-                parts = order_id.split('booking_')[-1]
-                bid = int(parts.split('_')[0])
-                booking_ref = Booking.objects.filter(id=bid).first()
-        except Exception:
-            booking_ref = None
+    with transaction.atomic():
+        if booking_ref is not None:
+            booking_ref = Booking.objects.select_for_update().get(pk=booking_ref.pk)
+        # looked up under the booking's lock, so a second callback for the same
+        # payment sees the record the first one created instead of creating another
+        if AdvancePayment.objects.filter(gateway='razorpay', gateway_id__in=[order_id, payment_id]).exists():
+            return JsonResponse({'success': True})     # already applied
+        if booking_ref is None:
+            logger.warning('No booking found for razorpay order %s', order_id)
+            return JsonResponse({'success': False, 'error': 'advance payment record not found'}, status=404)
         ap = AdvancePayment.objects.create(
             booking=booking_ref,
-            user=User.objects.get(id=request.session.get('user_id')),
+            user=request.user,
             amount=Decimal(str(payment_obj.get('amount') / 100.0)) if payment_obj.get('amount') else Decimal('0'),
             currency=payment_obj.get('currency', 'INR'),
             status=AdvancePayment.STATUS_SUCCEEDED,
@@ -976,95 +828,46 @@ def razorpay_payment_success(request):
             gateway_id=payment_id,
             gateway_response=payment_obj,
         )
-    else:
-        ap.status = AdvancePayment.STATUS_SUCCEEDED
-        ap.gateway_id = payment_id
-        ap.gateway_response = payment_obj
-        ap.save()
-
-    try:
-        if ap.booking:
-            ap.booking.apply_advance(ap.amount)
-    except Exception:
-        logger.exception('Failed to apply advance to booking after payment fetch')
+        booking_ref.apply_advance(ap.amount)
 
     return JsonResponse({'success': True})
 
-    # Find matching AdvancePayment by order id
-    try:
-        ap = AdvancePayment.objects.select_for_update().get(gateway_id=order_id, gateway='razorpay')
-    except AdvancePayment.DoesNotExist:
-        ap = AdvancePayment.objects.filter(gateway_id=order_id).first()
-
-    if not ap:
-        return JsonResponse({'success': False, 'error': 'advance payment record not found'}, status=404)
-
-    ap.status = AdvancePayment.STATUS_SUCCEEDED
-    ap.gateway_id = payment_id
-    ap.gateway_response = {'verified': True}
-    ap.save()
 
+@csrf_exempt
+@user_required
+def fake_gateway_pay(request):
+    """Checkout for the local stand-in gateway (PAYMENT_GATEWAY_BACKEND = 'fake'): pay an order."""
+    if request.method != 'POST' or gateway.backend_name() != 'fake':
+        raise Http404('Not available')
     try:
-        booking = ap.booking
-        booking.apply_advance(ap.amount)
-    except Exception:
-        logger.exception('Failed to apply advance to booking')
-
-    return JsonResponse({'success': True})
+        data = json.loads(request.body.decode('utf-8'))
+        client = gateway.client()
+        payment = client.pay(data['order_id'], status=data.get('status', 'captured'))
+    except (ValueError, KeyError, gateway.GatewayError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    # the gateway also reports the payment by webhook
+    webhooks.receive(json.dumps(client.webhook_event(payment)).encode())
+    return JsonResponse({
+        'razorpay_payment_id': payment['id'],
+        'razorpay_order_id': payment['order_id'],
+    })
 
 
 @csrf_exempt
 def razorpay_webhook(request):
-    """Handle Razorpay webhooks. Verifies signature and processes payment events."""
-    try:
-        import razorpay
-    except Exception:
-        logger.exception('Razorpay SDK not installed')
-        return JsonResponse({'ok': False}, status=500)
-
+    """Verify a Razorpay webhook and store it in the inbox; `manage.py process_webhooks` applies it."""
     body = request.body
-    signature = request.META.get('HTTP_X_RAZORPAY_SIGNATURE', '')
-    secret = getattr(settings, 'RAZORPAY_KEY_SECRET', '')
-
-    try:
-        razorpay.utility.verify_webhook_signature(body, signature, secret)
-    except Exception:
-        logger.exception('Invalid webhook signature')
+    if not webhooks.verify_signature(body, request.META.get('HTTP_X_RAZORPAY_SIGNATURE', '')):
+        logger.warning('Invalid webhook signature')
         return JsonResponse({'ok': False}, status=400)
 
     try:
-        data = json.loads(body.decode('utf-8'))
-    except Exception:
+        _, created = webhooks.receive(body, request.META.get('HTTP_X_RAZORPAY_EVENT_ID', ''))
+    except ValueError:
         return JsonResponse({'ok': False}, status=400)
 
-    event = data.get('event')
-    payload = data.get('payload', {})
-
-    if event and event.startswith('payment.'):
-        payment_obj = payload.get('payment', {}).get('entity')
-        if payment_obj:
-            order_id = payment_obj.get('order_id')
-            payment_id = payment_obj.get('id')
-            status = payment_obj.get('status')
-            aps = AdvancePayment.objects.filter(gateway_id=order_id, gateway='razorpay')
-            for ap in aps:
-                if status in ('captured', 'authorized'):
-                    ap.status = AdvancePayment.STATUS_SUCCEEDED
-                    ap.gateway_id = payment_id
-                    ap.gateway_response = payment_obj
-                    ap.save()
-                    try:
-                        ap.booking.apply_advance(ap.amount)
-                    except Exception:
-                        logger.exception('apply_advance failed in webhook')
-                else:
-                    ap.status = AdvancePayment.STATUS_FAILED
-                    ap.gateway_response = payment_obj
-                    ap.save()
-
-            # If no AdvancePayment was found, nothing to do (webhook may be for other orders)
-
-    return JsonResponse({'ok': True})
+    return JsonResponse({'ok': True, 'duplicate': not created})
 
 
 # ---------- Chat (user with vendors) ----------
@@ -1072,9 +875,13 @@ def razorpay_webhook(request):
 def user_chat(request):
     """List chat conversations with vendors."""
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
-    chats = Chat.objects.filter(user_id=user_id).select_related('vendor', 'store')
-    chats = chats.annotate(unread_count=Count('messages', filter=Q(messages__is_read=False)))
+    user = request.user
+    chats = (
+        Chat.objects.filter(user_id=user_id)
+        .select_related('vendor', 'store')
+        .annotate(unread_count=F('customer_unread'))
+        .order_by('-last_activity_at')
+    )
     return render(request, 'user/chat.html', {'chats': chats, 'user': user})
 
 
@@ -1082,7 +889,7 @@ def user_chat(request):
 def user_delete_chat(request, chat_id):
     """Allow the user to delete a chat/conversation they own."""
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     chat = get_object_or_404(Chat, id=chat_id, user_id=user_id)
 
     if request.method == 'POST':
@@ -1098,7 +905,7 @@ def user_delete_chat(request, chat_id):
 def user_chat_detail(request, chat_id):
     """Chat thread with a vendor."""
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     chat = get_object_or_404(Chat, id=chat_id, user_id=user_id)
 
     if request.method == 'POST':
@@ -1106,22 +913,39 @@ def user_chat_detail(request, chat_id):
         image = request.FILES.get('image')
         if message_text or image:
             ChatMessage.objects.create(chat=chat, sender=user, message=message_text or '', image=image)
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            return JsonResponse({'sent': bool(message_text or image)}, status=201)
         return redirect('user:user_chat_detail', chat_id=chat.id)
 
-    chat.messages.filter(is_read=False).exclude(sender_id=user_id).update(is_read=True)
-    messages_qs = chat.messages.select_related('sender').all()
+    unread.mark_chat_read(chat, by_vendor=False)
 
     return render(request, 'user/chat_detail.html', {
         'chat': chat,
-        'messages': messages_qs,
+        'page': chat_history.latest(chat),
         'user': user,
     })
 
 
+@user_required
+def user_chat_messages(request, chat_id):
+    """JSON: messages before/after a cursor (see vendor.chat_history)."""
+    chat = get_object_or_404(Chat, id=chat_id, user_id=request.session.get('user_id'))
+    return chat_history.json_response(
+        request, chat, 'user/include/chat_message.html', {'user': request.user}, by_vendor=False,
+    )
+
+
+@user_required
+def user_chat_events(request, chat_id):
+    """Server-Sent Events stream of one chat (see vendor.chat_events)."""
+    chat = get_object_or_404(Chat, id=chat_id, user_id=request.session.get('user_id'))
+    return chat_events.stream_response(request, chat)
+
+
 @user_required
 def user_delete_message(request, message_id):
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     msg = get_object_or_404(ChatMessage, id=message_id, sender_id=user_id)
     if request.method == 'POST':
         # delete attached file if present
@@ -1144,7 +968,7 @@ def user_delete_message(request, message_id):
 def start_chat(request, store_id):
     """Start or open chat with a store's vendor."""
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     store = get_object_or_404(Store, id=store_id, status=True)
     vendor = store.vendor
     # Only allow starting a chat when there is a confirmed booking between this user and vendor
@@ -1173,7 +997,7 @@ def start_chat(request, store_id):
 def vendor_photos(request):
     """Display all vendor photos grouped by user's events"""
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     
     # Get all events created by this user
     user_events = Event.objects.filter(owner=user)
@@ -1206,7 +1030,7 @@ def vendor_photos(request):
 def vendor_event_photos(request, event_id):
     """Display all photos for a specific event"""
     user_id = request.session.get('user_id')
-    user = User.objects.get(id=user_id)
+    user = request.user
     
     # Get specific event photos (ensure user owns this event)
     event = get_object_or_404(Event, id=event_id, owner=user)
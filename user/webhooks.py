@@ -0,0 +1,216 @@
+"""
+Razorpay webhook inbox: deliveries are verified and stored once per
+dedupe_key, then settled exactly once by `manage.py process_webhooks`.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from user.models import WebhookEvent
+from vendor.models import AdvancePayment, Booking
+
+logger = logging.getLogger(__name__)
+
+PROVIDER = "razorpay"
+MAX_ATTEMPTS = getattr(settings, "WEBHOOK_MAX_ATTEMPTS", 5)
+LEASE_SECONDS = getattr(settings, "WEBHOOK_LEASE_SECONDS", 60)
+
+# gateway payment statuses that mean the money is ours
+CAPTURED_STATUSES = ("captured", "authorized")
+
+
+def _secret() -> str:
+    return getattr(settings, "RAZORPAY_WEBHOOK_SECRET", "") or getattr(settings, "RAZORPAY_KEY_SECRET", "")
+
+
+# ---------------------------------------------------------------------------
+# Signatures
+# ---------------------------------------------------------------------------
+
+def sign(body: bytes, secret=None) -> str:
+    """The X-Razorpay-Signature for *body*: hex HMAC-SHA256 with the webhook secret."""
+    return hmac.new((secret or _secret()).encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(body: bytes, signature: str, secret=None) -> bool:
+    return bool(signature) and hmac.compare_digest(sign(body, secret), signature)
+
+
+# ---------------------------------------------------------------------------
+# Inbox
+# ---------------------------------------------------------------------------
+
+def _payment_entity(data) -> dict:
+    return ((data.get("payload") or {}).get("payment") or {}).get("entity") or {}
+
+
+def receive(body: bytes, event_id: str = "") -> tuple:
+    """
+    Store one verified delivery: (WebhookEvent, created), created False for
+    a redelivery.  Raises ValueError when *body* is not a webhook event.
+    """
+    try:
+        data = json.loads(body.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("invalid json") from exc
+    if not isinstance(data, dict) or not data.get("event"):
+        raise ValueError("not a webhook event")
+
+    entity = _payment_entity(data)
+    payment_id = str(entity.get("id") or "")
+    if payment_id:
+        key = f"{data['event']}:{payment_id}"
+    else:
+        key = event_id or hashlib.sha256(body).hexdigest()
+    return WebhookEvent.objects.get_or_create(
+        provider=PROVIDER,
+        dedupe_key=key[:255],
+        defaults={
+            "event_id": event_id[:100],
+            "event": str(data["event"])[:100],
+            "payment_id": payment_id[:100],
+            "order_id": str(entity.get("order_id") or "")[:100],
+            "payload": data,
+        },
+    )
+
+
+# ---------------------------------------------------------------------------
+# Settlement
+# ---------------------------------------------------------------------------
+
+def settle(order_id, payment_id, entity) -> int:
+    """
+    Record gateway payment *entity* against the AdvancePayment rows of
+    *order_id* / *payment_id* and apply captured ones to their bookings,
+    each at most once.  Returns how many advances were applied now.
+    """
+    captured = entity.get("status") in CAPTURED_STATUSES
+    gateway_ids = [value for value in (order_id, payment_id) if value]
+    if not gateway_ids:
+        return 0
+    applied = 0
+    with transaction.atomic():
+        advances = (
+            AdvancePayment.objects.select_for_update()
+            .filter(gateway=PROVIDER, gateway_id__in=gateway_ids)
+            .order_by("id")
+        )
+        for advance in advances:
+            if advance.status == AdvancePayment.STATUS_SUCCEEDED:
+                continue            # already applied by an earlier delivery or the checkout callback
+            advance.gateway_response = entity
+            if not captured:
+                advance.status = AdvancePayment.STATUS_FAILED
+                advance.save(update_fields=["status", "gateway_response"])
+                continue
+            advance.status = AdvancePayment.STATUS_SUCCEEDED
+            advance.gateway_id = payment_id or advance.gateway_id
+            advance.save(update_fields=["status", "gateway_id", "gateway_response"])
+            booking = Booking.objects.select_for_update().get(pk=advance.booking_id)
+            booking.apply_advance(advance.amount)
+            applied += 1
+    return applied
+
+
+def apply(webhook) -> None:
+    """Act on one inbox row; events other than payments are only recorded."""
+    entity = _payment_entity(webhook.payload)
+    if entity and (webhook.event.startswith("payment.") or webhook.event == "order.paid"):
+        settle(entity.get("order_id") or webhook.order_id, entity.get("id"), entity)
+
+
+# ---------------------------------------------------------------------------
+# Queue operations
+# ---------------------------------------------------------------------------
+
+def _expired(now):
+    return Q(claimed_at__lt=now - timedelta(seconds=LEASE_SECONDS))
+
+
+def _claimable(now, max_attempts=MAX_ATTEMPTS):
+    return (
+        Q(status=WebhookEvent.STATUS_PENDING)
+        | Q(_expired(now), status__in=(WebhookEvent.STATUS_FAILED, WebhookEvent.STATUS_PROCESSING),
+            attempts__lt=max_attempts)
+    )
+
+
+def fail_exhausted(max_attempts: int = MAX_ATTEMPTS) -> int:
+    """Mark rows whose worker lost every attempt's lease 'failed' instead of reclaiming them forever."""
+    return WebhookEvent.objects.filter(
+        _expired(timezone.now()), status=WebhookEvent.STATUS_PROCESSING, attempts__gte=max_attempts,
+    ).update(status=WebhookEvent.STATUS_FAILED, error="worker lost the event on every attempt (lease expired)")
+
+
+def pending_count(max_attempts: int = MAX_ATTEMPTS) -> int:
+    return WebhookEvent.objects.filter(_claimable(timezone.now(), max_attempts)).count()
+
+
+def claim_batch(limit: int, max_attempts: int = MAX_ATTEMPTS) -> list:
+    """Atomically claim up to *limit* inbox rows, oldest first."""
+    fail_exhausted(max_attempts)
+    now = timezone.now()
+    candidates = list(
+        WebhookEvent.objects
+        .filter(_claimable(now, max_attempts))
+        .order_by("received_at", "id")
+        .values_list("id", "status", "claimed_at")[: limit * 2]
+    )
+    claimed_ids = []
+    for event_id, status, claimed_at in candidates:
+        if len(claimed_ids) >= limit:
+            break
+        won = WebhookEvent.objects.filter(id=event_id, status=status, claimed_at=claimed_at).update(
+            status=WebhookEvent.STATUS_PROCESSING,
+            claimed_at=now,
+            attempts=F("attempts") + 1,
+        )
+        if won:
+            claimed_ids.append(event_id)
+    events = WebhookEvent.objects.in_bulk(claimed_ids)
+    return [events[event_id] for event_id in claimed_ids if event_id in events]
+
+
+def process(webhook) -> str:
+    """Apply one claimed row and record the outcome; returns the new status."""
+    try:
+        apply(webhook)
+    except Exception as exc:
+        logger.exception("Webhook %s (%s) failed", webhook.id, webhook.event)
+        webhook.status = WebhookEvent.STATUS_FAILED
+        webhook.error = str(exc)[:2000]
+        webhook.save(update_fields=["status", "error"])
+    else:
+        webhook.status = WebhookEvent.STATUS_DONE
+        webhook.error = ""
+        webhook.processed_at = timezone.now()
+        webhook.save(update_fields=["status", "error", "processed_at"])
+    return webhook.status
+
+
+def process_pending(batch_size: int = 100, max_attempts: int = MAX_ATTEMPTS) -> int:
+    """Work the inbox until nothing is claimable; returns rows processed."""
+    processed = 0
+    while True:
+        batch = claim_batch(batch_size, max_attempts)
+        if not batch:
+            return processed
+        for webhook in batch:
+            process(webhook)
+        processed += len(batch)
+
+
+def requeue_failed() -> int:
+    """Give every exhausted failed row a fresh set of attempts."""
+    return WebhookEvent.objects.filter(status=WebhookEvent.STATUS_FAILED).update(
+        status=WebhookEvent.STATUS_PENDING, attempts=0, claimed_at=None,
+    )